@@ -1,298 +1,1010 @@
 import time
 import random
-from graphviz import Digraph 
+from BitBoard import window_tables, window_weights
+from SearchStats import SearchStats
+from MoveOrdering import MoveOrderer
+from TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+# (column offset, probability) of where a piece lands when the computer picks a column
+CHANCE_OUTCOMES = ((0, 0.6), (-1, 0.2), (1, 0.2))
+
+# Bound flags seen from the other player's point of view
+_SWAPPED_FLAG = {EXACT: EXACT, LOWER_BOUND: UPPER_BOUND, UPPER_BOUND: LOWER_BOUND}
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when a time-limited get_best_move runs out of time."""
+
+
+class SearchCancelled(Exception):
+    """Raised out of get_best_move when its cancel_event is set."""
+
 
 class AIAgent:
-    
-    def __init__(self, computer_player, human_player, depth):
+
+    ALGORITHMS = ("minimax", "minimax_ab", "expected_minimax", "expected_minimax_star", "pvs")
+    # Nodes searched between two deadline checks (a power of two minus one, used as a mask)
+    DEADLINE_CHECK_MASK = 1023
+    # Slack on the Star1 windows: expected values are float sums, so an outcome whose
+    # value ties the window edge is searched exactly rather than cut on rounding error
+    STAR_EPSILON = 1e-9
+    # Share of a time limit the endgame solver may use before the usual search takes over
+    ENDGAME_TIME_SHARE = 0.5
+    # Half-width of the first pvs window around the value expected from earlier iterations
+    ASPIRATION_WINDOW = 8
+    # Size of the table pvs gets for one call when the agent has none
+    PVS_TABLE_ENTRIES = 1 << 16
+
+    def __init__(self, computer_player, human_player, depth, tracer=None, transposition_table=None, move_orderer=None,
+                 parallel_search=None, batch_evaluator=None, expectimax_cache=None, opening_book=None,
+                 endgame_solver=None, evaluation_store=None):
         self.computer_player = computer_player
         self.human_player = human_player
         self.depth = depth
-        self.graph_source = "" 
-        self._node_counter = 0
-        self._best_path_edges = [] 
-
-    def get_best_move(self, board, algorithm):
-        """Main entry point for the AI to select a move and generate the graph."""
-        self._node_counter = 0
-        self._best_path_edges = []
-        
-        # Define Global Graph Attributes for Elegance (Dark theme base)
-        # *** Added 'splines': 'curved' to enable flexible, curved edges ***
-        dot = Digraph(comment='Connect Four Search Tree', 
-                      graph_attr={'rankdir': 'TB', 'bgcolor': '#282a36', 'fontname': 'Palatino', 'nodesep': '0.5', 'ranksep': '0.7', 'splines': 'curved'},
-                      node_attr={'fontname': 'Palatino', 'fontsize': '10', 'color': '#f8f8f2', 'fontcolor': '#f8f8f2'}, # Default white text
-                      edge_attr={'fontname': 'Palatino', 'fontsize': '9', 'color': '#f8f8f2'})
-        
-        if not board.get_valid_moves():
+        # Optional SearchTracer; when None the search records nothing but the move
+        self.tracer = tracer
+        # Optional TranspositionTable shared by minimax, minimax_ab and pvs. It is kept
+        # across calls, so later moves of the same game start with a warm table.
+        self.transposition_table = transposition_table
+        # Optional MoveOrderer used by minimax_ab and pvs; without one minimax_ab searches children
+        # in column order and pvs orders them with a MoveOrderer of its own for the call
+        self.move_orderer = move_orderer
+        # Optional ParallelSearch that splits untraced searches across worker processes
+        self.parallel_search = parallel_search
+        # Optional BatchEvaluator: untraced minimax and expected_minimax score the
+        # children of depth-1 nodes in one NumPy call instead of one at a time
+        self.batch_evaluator = batch_evaluator
+        # Optional ExpectimaxCache of node values for expected_minimax and expected_minimax_star
+        self.expectimax_cache = expectimax_cache
+        # Optional OpeningBook; positions it holds for the chosen algorithm are played without a search
+        self.opening_book = opening_book
+        # Optional EndgameSolver; minimax, minimax_ab and pvs hand it positions with few empty cells left
+        self.endgame_solver = endgame_solver
+        # Optional EvaluationStore behind the transposition table: minimax, minimax_ab and
+        # pvs read results of earlier games from it and record theirs for later ones
+        self.evaluation_store = evaluation_store
+        self._store = None  # evaluation_store while it matches the board being searched
+        self._iteration_values = {}  # Depth -> value of the pvs iterations of the current search
+        self.graph_source = ""
+        self._root_depth = depth
+        self._deadline = None
+        self._cancel_event = None
+        self._search_start = time.perf_counter()
+        self.last_stats = None  # SearchStats of the last get_best_move call
+        self.reset_search_stats()
+
+    def reset_search_stats(self):
+        self.nodes = 0
+        self.ply_nodes = []  # Nodes per ply below the root, over all iterations
+        self.leaf_evaluations = 0
+        self.terminal_evaluations = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0  # Cutoffs caused by the first child searched
+        self.completed_depth = 0  # Depth of the last search iteration that finished
+        self.iterations = []  # (depth, seconds, nodes) per completed iteration
+        self.last_value = None
+
+    def get_search_stats(self):
+        """The SearchStats of the last get_best_move call (None before the first)."""
+        return self.last_stats
+
+    def _caches(self):
+        """Name and table of every cache this agent probes."""
+        caches = [('tt', self.transposition_table), ('expectimax_cache', self.expectimax_cache),
+                  ('evaluation_store', self.evaluation_store)]
+        if self.endgame_solver is not None:
+            caches.append(('endgame_tt', self.endgame_solver.transposition_table))
+        return [(name, table) for name, table in caches if table is not None]
+
+    def _make_stats(self, algorithm, source, move, probes_before):
+        hit_rates = {}
+        for name, table in self._caches():
+            hits = table.hits - probes_before[name][0]
+            misses = table.misses - probes_before[name][1]
+            if hits + misses:
+                hit_rates[name] = hits / (hits + misses)
+        return SearchStats(algorithm, source, self.completed_depth, self.last_value, move, self.nodes, self.ply_nodes,
+                           self.leaf_evaluations, self.terminal_evaluations, self.cutoffs, self.first_move_cutoffs,
+                           hit_rates, self.iterations, time.perf_counter() - self._search_start)
+
+    def get_best_move(self, board, algorithm, time_limit=None, cancel_event=None, max_depth=None):
+        """
+        Main entry point for the AI to select a move (and trace the search if a tracer is set).
+
+        Without a time_limit the search runs to the agent's fixed depth. With a
+        time_limit (seconds) it deepens iteratively from depth 1 until the time
+        runs out, max_depth is reached (if given) or the board is searched to the
+        end, and plays the best move of the deepest iteration that finished;
+        completed_depth reports that depth.
+
+        cancel_event is an optional threading.Event; setting it from another
+        thread makes the search raise SearchCancelled within a few thousand nodes.
+        """
+        valid_moves = board.get_valid_moves()
+        if not valid_moves:
             self.graph_source = ""
             return -1
-        
-        best_col = -1
-        root_id = self._get_next_node_id()
-        value = 0 
+        if algorithm not in self.ALGORITHMS:
+            return random.choice(valid_moves)
 
-        # Call the corresponding graph-building search function
-        if algorithm == "minimax_ab":
-            value, best_col, best_path_id = self._minimax_graph(board, self.depth, -float('inf'), float('inf'), True, 'AB', dot, root_id, None, None)
-        elif algorithm == "minimax":
-            value, best_col, best_path_id = self._minimax_graph(board, self.depth, -float('inf'), float('inf'), True, 'STANDARD', dot, root_id, None, None)
-        elif algorithm == "expected_minimax":
-            value, best_col, best_path_id = self._expected_minimax_graph(board, self.depth, True, dot, root_id, None, None)
-        else:
-            valid_moves = board.get_valid_moves()
-            return random.choice(valid_moves) if valid_moves else -1
+        probes_before = {name: (table.hits, table.misses) for name, table in self._caches()}
+        self._search_start = time.perf_counter()
+
+        book = self.opening_book
+        if book is not None and book.algorithm == algorithm:
+            entry = book.probe(board)
+            if entry is not None and board.is_valid_move(entry[0]):
+                self.reset_search_stats()
+                self.completed_depth = book.depth
+                self.last_value = entry[1]
+                self.graph_source = ""
+                self.last_stats = self._make_stats(algorithm, 'book', entry[0], probes_before)
+                return entry[0]
+
+        # Null windows only save nodes when the first move searched is usually the best:
+        # without ordering pvs searches more than minimax_ab, so it always orders its moves
+        call_tables = algorithm == "pvs" and (self.transposition_table is None or self.move_orderer is None)
+        if call_tables:
+            agent_tables = self.transposition_table, self.move_orderer
+            if self.transposition_table is None:
+                self.transposition_table = TranspositionTable(self.PVS_TABLE_ENTRIES)
+            if self.move_orderer is None:
+                self.move_orderer = MoveOrderer(board.cols)
 
-        # --- Highlighting the Best Path ---
-        if best_path_id is not None:
-             self._highlight_path(dot, root_id, best_path_id, best_col)
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        if self.move_orderer is not None:
+            self.move_orderer.new_search()
+        if self.expectimax_cache is not None:
+            self.expectimax_cache.new_search()
+        store = self.evaluation_store
+        self._store = store if store is not None and self.transposition_table is not None and store.matches(board) else None
+        self.reset_search_stats()
+        self._iteration_values = {}
 
-        # Highlight the final chosen move and score on the root node
-        dot.node(root_id, label=f"ROOT (D={self.depth})\n{algorithm.title()}\nFinal Score: {value:.2f}\nChosen Move: Col {best_col}", 
-                 style='filled', fillcolor='#50fa7b', shape='box', fontcolor='#282a36') 
+        self._cancel_event = cancel_event
+        source = 'search'
+        # Played if no search iteration completes (e.g. a max_depth below 1)
+        value, best_col, best_child_id, root_id = None, valid_moves[0], None, None
+        try:
+            solved = None
+            solver = self.endgame_solver
+            if solver is not None and algorithm in ("minimax", "minimax_ab", "pvs") and solver.applies(board):
+                solved = self._solve_endgame(board, time_limit)
+            if solved is not None:
+                # Solved to the end of the game; the solver does not record a trace
+                value, best_col = solved
+                self.completed_depth = board.rows * board.cols - board.moves_played
+                best_child_id = root_id = None
+                source = 'endgame'
+            elif self.parallel_search is not None and self.tracer is None:
+                remaining = None if time_limit is None else self._remaining_time(time_limit)
+                value, best_col = self.parallel_search.search(self, board, algorithm, remaining)
+                best_child_id = root_id = None
+                self.iterations.append((self.completed_depth, time.perf_counter() - self._search_start, self.nodes))
+            elif time_limit is None:
+                # pvs deepens to the depth: each iteration leaves hash moves and an
+                # aspiration window for the next
+                for depth in range(1, self.depth + 1) if algorithm == "pvs" else (self.depth,):
+                    value, best_col, best_child_id, root_id = self._search(board, algorithm, depth)
+                self.completed_depth = self.depth
+            else:
+                # The budget counts from the start of the call, including an unfinished endgame solve
+                deadline = time.perf_counter() + self._remaining_time(time_limit)
+                empty_cells = sum(cell == 0 for column in board.get_board_state() for cell in column)
+                last_depth = empty_cells if max_depth is None else min(empty_cells, max_depth)
+                for depth in range(1, last_depth + 1):
+                    try:
+                        value, best_col, best_child_id, root_id = self._search(board, algorithm, depth)
+                    except SearchTimeout:
+                        best_child_id = None  # Its node IDs belong to the abandoned trace
+                        break
+                    self.completed_depth = depth
+                    # Depth 1 always finishes so there is a move to play; deeper iterations may be cut off
+                    self._deadline = deadline
+                    if time.perf_counter() >= deadline:
+                        break
+        finally:
+            self._deadline = None
+            self._cancel_event = None
+            self._store = None
+            if call_tables:
+                self.transposition_table, self.move_orderer = agent_tables
+
+        self.last_value = value
+        if self.tracer is not None and root_id is not None:
+            # With a time limit the trace holds the last iteration, which may have been cut short
+            self.tracer.finish(root_id, value, best_col, best_child_id)
+            self.graph_source = self.tracer.get_source()
+        else:
+            self.graph_source = ""
 
-        # Store the final graph source
-        self.graph_source = dot.source
-        
         # Ensure best_col is an integer
         if best_col is None or not isinstance(best_col, int):
-            valid_moves = board.get_valid_moves()
-            best_col = random.choice(valid_moves) if valid_moves else -1
-        
+            best_col = random.choice(valid_moves)
+
+        self.last_stats = self._make_stats(algorithm, source, best_col, probes_before)
         return best_col
 
+    def _remaining_time(self, time_limit):
+        """Seconds of time_limit left in the current get_best_move call."""
+        return max(0.0, self._search_start + time_limit - time.perf_counter())
+
+    def _solve_endgame(self, board, time_limit=None):
+        """
+        (value, best_col) from the endgame solver. With a time_limit the solver
+        gets ENDGAME_TIME_SHARE of it and None is returned if it does not finish
+        in time, leaving the rest of the budget to the usual search.
+        """
+        solver = self.endgame_solver
+        if time_limit is not None:
+            self._deadline = self._search_start + time_limit * self.ENDGAME_TIME_SHARE
+        try:
+            result = solver.solve(board, self.computer_player, self._check_deadline)
+        except SearchTimeout:
+            result = None
+        finally:
+            self._deadline = None
+            self.nodes, self.cutoffs = solver.nodes, solver.cutoffs
+        return result
+
+    def _search(self, board, algorithm, depth):
+        """One complete search to the given depth. Returns (value, best_col, best_child_id, root_id)."""
+        tracer = self.tracer
+        root_id = tracer.begin(algorithm, depth) if tracer is not None else None
+        self._set_root_depth(depth)
+        start_time, start_nodes = time.perf_counter(), self.nodes
+
+        # Call the corresponding search function
+        if algorithm == "minimax_ab":
+            result = self._minimax(board, depth, -float('inf'), float('inf'), True, True, root_id)
+        elif algorithm == "minimax":
+            result = self._minimax(board, depth, -float('inf'), float('inf'), True, False, root_id)
+        elif algorithm == "expected_minimax_star":
+            result = self._star_expected_minimax(board, depth, -float('inf'), float('inf'), True, root_id)
+        elif algorithm == "pvs":
+            result, root_id = self._aspiration_search(board, depth, root_id)
+        else:
+            result = self._expected_minimax(board, depth, True, root_id)
+        self.iterations.append((depth, time.perf_counter() - start_time, self.nodes - start_nodes))
+        return result + (root_id,)
+
+    def _set_root_depth(self, depth):
+        self._root_depth = depth
+        if len(self.ply_nodes) <= depth:
+            self.ply_nodes.extend([0] * (depth + 1 - len(self.ply_nodes)))
+
+    def evaluate_position(self, board, algorithm, depth, maximizing_player=True, time_limit=None):
+        """
+        Value of board searched to depth with a full window and no tracing (used by
+        ParallelSearch workers). Raises SearchTimeout if time_limit seconds pass first.
+        """
+        self._set_root_depth(depth)
+        if time_limit is not None:
+            self._deadline = time.perf_counter() + time_limit
+        try:
+            if algorithm == "expected_minimax":
+                return self._expected_minimax(board, depth, maximizing_player)[0]
+            if algorithm == "expected_minimax_star":
+                return self._star_expected_minimax(board, depth, -float('inf'), float('inf'), maximizing_player)[0]
+            if algorithm == "pvs":
+                player = self.computer_player if maximizing_player else self.human_player
+                value = self._pvs(board, depth, -float('inf'), float('inf'), player)[0]
+                return value if maximizing_player else -value
+            return self._minimax(board, depth, -float('inf'), float('inf'), maximizing_player, algorithm == "minimax_ab")[0]
+        finally:
+            self._deadline = None
+
+    def check_cancelled(self):
+        """Raises SearchCancelled if the cancel_event of the current call is set."""
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise SearchCancelled()
+
+    def _check_deadline(self):
+        """Raises SearchCancelled or SearchTimeout once the current call must stop."""
+        self.check_cancelled()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+    def get_progress(self):
+        """Live counters of the running (or last) get_best_move call; safe to poll from another thread."""
+        elapsed = time.perf_counter() - self._search_start
+        return {
+            'depth': self._root_depth,
+            'completed_depth': self.completed_depth,
+            'nodes': self.nodes,
+            'elapsed': elapsed,
+            'nodes_per_second': self.nodes / elapsed if elapsed > 0 else 0.0,
+        }
+
     def get_graphviz_source(self):
         """Returns the Graphviz DOT source string for the GUI to render."""
         return self.graph_source
 
-    def _get_next_node_id(self):
-        """Generates a unique ID for each node."""
-        self._node_counter += 1
-        return f"N{self._node_counter}"
-
-    def _highlight_path(self, dot, parent_id, child_id, move_col):
-        """Helper to mark the optimal edge from the root."""
-        # This is a simplified direct edge highlight from the root.
-        dot.edge(parent_id, child_id, label=f"Col {move_col}", color='#50fa7b', penwidth='3', fontcolor='#50fa7b')
-        return
-
-    # --- Standard Game Logic (Unchanged) ---
-    def _simulate_move(self, board, col, player):
-        for r in range(board.rows):
-            if board.board[col][r] == 0:
-                board.board[col][r] = player
-                return r, col
-        return -1, -1 
-
-    def _undo_move(self, board, row, col):
-        if row != -1:
-            board.board[col][row] = 0
-
-    def _check_terminal(self, board):
+    def leaf_value(self, board, depth):
+        """Score of a full board or a depth-0 node; None for nodes that must be expanded."""
         if board.is_board_full():
-            return 0 
-        return None 
-    
-    # --- Minimax Search for Graphviz ---
-    def _minimax_graph(self, board, depth, alpha, beta, maximizing_player, mode, dot, parent_id, edge_label, parent_is_chance):
-        
-        terminal_state = self._check_terminal(board)
-        is_terminal = terminal_state is not None
-        is_heuristic = depth == 0
-
-        player_label = "MAX" if maximizing_player else "MIN"
-        current_node_id = parent_id
-
-        # --- Node Styling ---
-        if is_terminal:
-            score = board.count_connected_fours(self.computer_player) - board.count_connected_fours(self.human_player)
-            label = f"TERMINAL (Draw)\nScore Diff: {score}"
-            fillcolor = '#bd93f9'
-            fontcolor = '#282a36' # Black font
-            shape = 'box'
-        elif is_heuristic:
-            score = board.evaluate_heuristic(self.computer_player)
-            label = f"Value: {score:.2f}" 
-            fillcolor = '#f1fa8c'
-            fontcolor = '#282a36' # Black font
-            shape = 'box'
-        else:
-            score = None
-            fillcolor = '#ff5555' if maximizing_player else '#ff79c6' # MAX (Red-Pink) vs MIN (Pink)
-            fontcolor = '#f8f8f2' # White font
-            shape = 'ellipse'
-            
-            # Initial label for internal nodes 
-            if mode == 'AB':
-                label = f"{player_label} D={depth}\nA: {alpha:.2f}\nB: {beta:.2f}"
+            self.terminal_evaluations += 1
+            return board.count_connected_fours(self.computer_player) - board.count_connected_fours(self.human_player)
+        if depth == 0:
+            self.leaf_evaluations += 1
+            return board.evaluate_heuristic(self.computer_player)
+        return None
+
+    # --- Minimax Search ---
+    def _minimax(self, board, depth, alpha, beta, maximizing_player, pruning, node_id=None, edge=None):
+        tracer = self.tracer
+        self.nodes += 1
+        if not self.nodes & self.DEADLINE_CHECK_MASK:
+            self._check_deadline()
+        ply = self._root_depth - depth
+        self.ply_nodes[ply] += 1
+
+        score = self.leaf_value(board, depth)
+        if score is not None:
+            if tracer is not None:
+                tracer.add_node(node_id, 'terminal' if board.is_board_full() else 'heuristic', depth, edge, value=score)
+            return score, None, node_id
+
+        # Transposition table lookup (needs a board with a Zobrist hash, i.e. BitBoard)
+        tt = self.transposition_table
+        store = self._store
+        hash_move = None
+        if tt is not None:
+            key = board.key
+            entry = tt.probe(key)
+            if entry is None and store is not None and depth >= store.min_depth:
+                entry = store.probe(key, self.computer_player)
+                if entry is not None:
+                    tt.store(key, entry[1], entry[2], entry[3], entry[4])
+            if entry is not None:
+                hash_move = board.canonical_move(entry[4])
+            # The root is always searched so its move does not depend on earlier searches
+            if entry is not None and entry[1] >= depth and ply > 0:
+                tt_value, flag = entry[2], entry[3]
+                if flag == EXACT or (pruning and ((flag == LOWER_BOUND and tt_value >= beta) or (flag == UPPER_BOUND and tt_value <= alpha))):
+                    if tracer is not None:
+                        tracer.add_node(node_id, 'tt', depth, edge, value=tt_value)
+                    return tt_value, hash_move, node_id
+            alpha_orig, beta_orig = alpha, beta
+
+        if depth == 1 and not pruning and self.batch_evaluator is not None and tracer is None:
+            valid_moves = self._unique_moves(board, board.get_valid_moves())
+            scores = self._batch_leaf_values(board, valid_moves, self.computer_player if maximizing_player else self.human_player)
+            value = max(scores) if maximizing_player else min(scores)
+            return value, valid_moves[scores.index(value)], None
+
+        kind = 'max' if maximizing_player else 'min'
+        if tracer is not None:
+            if pruning:
+                tracer.add_node(node_id, kind, depth, edge, alpha=alpha, beta=beta)
             else:
-                label = f"{player_label} D={depth}" 
-
-        # 2. Add current node to graph
-        dot.node(current_node_id, label=label, style='filled', fillcolor=fillcolor, shape=shape, margin='0.1', fontcolor=fontcolor)
-        
-        # 3. Connect to parent
-        if edge_label is not None:
-            dot.edge(edge_label[0], current_node_id, label=edge_label[1], color='#f8f8f2', penwidth='1') 
-            
-        if is_terminal or is_heuristic:
-            return score, None, current_node_id
-
-        # 4. Search Logic
-        valid_moves = board.get_valid_moves()
-        best_col = valid_moves[0] if valid_moves else None
-        
+                tracer.add_node(node_id, kind, depth, edge)
+
+        player = self.computer_player if maximizing_player else self.human_player
+        orderer = self.move_orderer if pruning else None
+        if orderer is not None:
+            valid_moves = orderer.order_moves(board, ply, player, hash_move)
+        else:
+            valid_moves = board.get_valid_moves()
+        valid_moves = self._unique_moves(board, valid_moves)
+        best_col = valid_moves[0]
+
         value = -float('inf') if maximizing_player else float('inf')
         best_child_id = None
-        
-        for col in valid_moves:
-            child_id = self._get_next_node_id()
-            row, played_col = self._simulate_move(board, col, self.computer_player if maximizing_player else self.human_player)
-            
-            score, _, child_path_id = self._minimax_graph(board, depth - 1, alpha, beta, not maximizing_player, mode, dot, child_id, (current_node_id, f"Col {col}"), None)
-            
-            self._undo_move(board, row, played_col)
-            
+        child_id = child_edge = None
+
+        for index, col in enumerate(valid_moves):
+            if tracer is not None:
+                child_id = tracer.new_node()
+                child_edge = (node_id, f"Col {col}")
+
+            # With reordered root moves, break ties toward the lowest column as the
+            # unordered search does: a lower column is searched with alpha lowered
+            # by one (scores are integers) so an equal score comes back exact.
+            tie_break = orderer is not None and ply == 0 and index > 0 and col < best_col
+            child_alpha = alpha - 1 if tie_break else alpha
+
+            board.make_move(col, player)
+            try:
+                score, _, _ = self._minimax(board, depth - 1, child_alpha, beta, not maximizing_player, pruning, child_id, child_edge)
+            finally:
+                board.undo_move(col)  # Also runs when a SearchTimeout unwinds the search
+
             # Update value and best_col
             if maximizing_player:
-                if score > value:
+                if score > value or (tie_break and score == value):
                     value = score
                     best_col = col
-                    best_child_id = child_path_id
+                    best_child_id = child_id
                 alpha = max(alpha, value)
             else: # Minimizing Player
                 if score < value:
                     value = score
                     best_col = col
-                    best_child_id = child_path_id
+                    best_child_id = child_id
                 beta = min(beta, value)
 
             # Update node label with current best value and bounds
-            if not is_terminal and not is_heuristic:
-                if mode == 'AB':
-                    current_label = f"{player_label} D={depth}\nValue: {value:.2f}\nA: {alpha:.2f}\nB: {beta:.2f}"
+            if tracer is not None:
+                if pruning:
+                    tracer.update_node(node_id, kind, depth, value, alpha, beta)
                 else:
-                    current_label = f"{player_label} D={depth}\nValue: {value:.2f}"
-                dot.node(current_node_id, label=current_label, style='filled', fillcolor=fillcolor, shape=shape, fontcolor=fontcolor)
+                    tracer.update_node(node_id, kind, depth, value)
 
             # Pruning check
-            if mode == 'AB' and (alpha >= beta):
-                dot.edge(current_node_id, child_id, color='#ff5555', style='dashed', label='PRUNED', penwidth='2')
-                break 
-        
+            if pruning and alpha >= beta:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                if orderer is not None:
+                    orderer.record_cutoff(col, ply, depth, player)
+                if tracer is not None:
+                    tracer.mark_pruned(node_id, child_id)
+                break
+
+        if tt is not None:
+            if not pruning or alpha_orig < value < beta_orig:
+                flag = EXACT
+            elif value <= alpha_orig:
+                flag = UPPER_BOUND
+            else:
+                flag = LOWER_BOUND
+            stored_col = board.canonical_move(best_col)
+            tt.store(key, depth, value, flag, stored_col)
+            if store is not None:
+                store.record(key, depth, value, flag, stored_col, self.computer_player)
+
         return value, best_col, best_child_id
-    
-    # --- Expected Minimax Search for Graphviz ---
-    def _expected_minimax_graph(self, board, depth, maximizing_player, dot, parent_id, edge_label, parent_is_chance):
-        
-        terminal_state = self._check_terminal(board)
-        is_terminal = terminal_state is not None
-        is_heuristic = depth == 0
-        current_node_id = parent_id
-
-        # --- Node Styling ---
-        if is_terminal:
-            score = board.count_connected_fours(self.computer_player) - board.count_connected_fours(self.human_player)
-            label = f"TERMINAL (Draw)\nScore Diff: {score}"
-            fillcolor = '#bd93f9'
-            fontcolor = '#282a36' # Black font
-            shape = 'box'
-        elif is_heuristic:
-            score = board.evaluate_heuristic(self.computer_player)
-            label = f"Value: {score:.2f}" 
-            fillcolor = '#f1fa8c'
-            fontcolor = '#282a36' # Black font
-            shape = 'box'
-        elif maximizing_player:
-            label = f"MAX\nD={depth}"
-            fillcolor = '#50fa7b'
-            fontcolor = '#282a36' # Black font
-            shape = 'ellipse'
+
+    # --- Principal Variation Search ---
+    def _aspiration_search(self, board, depth, root_id=None):
+        """
+        Root of a pvs iteration. Returns ((value, best_col, best_child_id), root_id).
+
+        The first search uses a window ASPIRATION_WINDOW wide on either side of
+        the value of the iteration two plies shallower: the heuristic swings
+        between odd and even depths (the side that moved last looks better), so
+        the previous iteration is a poor guess. A value outside the window is
+        only a bound, so the search is repeated with that side moved past it,
+        twice as far each time, until the value is exact. Without that iteration
+        the window is full. A trace holds the last of these searches.
+        """
+        guess = self._iteration_values.get(depth - 2)
+        delta = self.ASPIRATION_WINDOW
+        if guess is None:
+            alpha, beta = -float('inf'), float('inf')
         else:
-            label = f"MIN\nD={depth}"
-            fillcolor = '#ff5555'
-            fontcolor = '#f8f8f2' # White font
-            shape = 'ellipse'
+            alpha, beta = guess - delta, guess + delta
+        while True:
+            result = self._pvs(board, depth, alpha, beta, self.computer_player, root_id)
+            value = result[0]
+            if alpha < value < beta:
+                self._iteration_values[depth] = value
+                return result, root_id
+            delta *= 2
+            if value <= alpha:
+                alpha = value - delta
+            else:
+                beta = value + delta
+            if self.tracer is not None:
+                root_id = self.tracer.begin("pvs", depth)
 
-        dot.node(current_node_id, label=label, style='filled', fillcolor=fillcolor, shape=shape, margin='0.1', fontcolor=fontcolor)
-        if edge_label is not None:
-            dot.edge(edge_label[0], current_node_id, label=edge_label[1], color='#f8f8f2', penwidth='1')
+    def _pvs(self, board, depth, alpha, beta, player, node_id=None, edge=None):
+        """
+        Negamax alpha-beta with principal variation search, for player to move.
+        Values are from player's point of view (fail-soft, like _minimax).
 
-        if is_terminal or is_heuristic:
-            return score, None, current_node_id
+        The first child is searched with the full window, the others with a
+        null window just above alpha, which only tells whether they beat it.
+        Scores are integers, so that window is one point wide. A child that
+        beats alpha is searched again with the full window. Table entries and
+        traced values are from the computer's point of view, as in _minimax,
+        so the two searches share tables. Re-searches make it slower than
+        _minimax when the best move is not usually searched first, which is
+        why get_best_move never runs it without move ordering.
+        """
+        tracer = self.tracer
+        self.nodes += 1
+        if not self.nodes & self.DEADLINE_CHECK_MASK:
+            self._check_deadline()
+        ply = self._root_depth - depth
+        self.ply_nodes[ply] += 1
+        sign = 1 if player == self.computer_player else -1
 
-        valid_moves = board.get_valid_moves()
-        best_col = valid_moves[0] if valid_moves else None
+        score = self.leaf_value(board, depth)
+        if score is not None:
+            if tracer is not None:
+                tracer.add_node(node_id, 'terminal' if board.is_board_full() else 'heuristic', depth, edge, value=score)
+            return sign * score, None, node_id
+
+        tt = self.transposition_table
+        store = self._store
+        hash_move = None
+        alpha_orig = alpha
+        if tt is not None:
+            key = board.key
+            entry = tt.probe(key)
+            if entry is None and store is not None and depth >= store.min_depth:
+                entry = store.probe(key, self.computer_player)
+                if entry is not None:
+                    tt.store(key, entry[1], entry[2], entry[3], entry[4])
+            if entry is not None:
+                hash_move = board.canonical_move(entry[4])
+            # The root is always searched so its move does not depend on earlier searches
+            if entry is not None and entry[1] >= depth and ply > 0:
+                tt_value = sign * entry[2]
+                flag = entry[3] if sign > 0 else _SWAPPED_FLAG[entry[3]]
+                if flag == EXACT or (flag == LOWER_BOUND and tt_value >= beta) or (flag == UPPER_BOUND and tt_value <= alpha):
+                    if tracer is not None:
+                        tracer.add_node(node_id, 'tt', depth, edge, value=entry[2])
+                    return tt_value, hash_move, node_id
+
+        kind = 'max' if sign > 0 else 'min'
+        if tracer is not None:
+            traced_alpha, traced_beta = self._traced_window(sign, alpha, beta)
+            tracer.add_node(node_id, kind, depth, edge, alpha=traced_alpha, beta=traced_beta)
+
+        orderer = self.move_orderer
+        if orderer is not None:
+            moves = orderer.order_moves(board, ply, player, hash_move)
+        else:
+            # Null windows only pay off when the first move is good: try the center first
+            moves = sorted(board.get_valid_moves(), key=lambda col: abs(2 * col - (board.cols - 1)))
+        moves = self._unique_moves(board, moves)
+        best_col = moves[0]
+
+        value = -float('inf')
+        best_child_id = None
+        child_id = child_edge = None
+        opponent = 3 - player
+
+        for index, col in enumerate(moves):
+            if tracer is not None:
+                child_id = tracer.new_node()
+                child_edge = (node_id, f"Col {col}")
+
+            # Root ties go to the lowest column, as in _minimax
+            tie_break = ply == 0 and index > 0 and col < best_col
+            child_alpha = alpha - 1 if tie_break else alpha
+
+            board.make_move(col, player)
+            try:
+                if index == 0:
+                    score, _, _ = self._pvs(board, depth - 1, -beta, -child_alpha, opponent, child_id, child_edge)
+                    score = -score
+                else:
+                    score, _, _ = self._pvs(board, depth - 1, -child_alpha - 1, -child_alpha, opponent, child_id, child_edge)
+                    score = -score
+                    if child_alpha < score < beta:
+                        if tracer is not None:
+                            tracer.mark_pruned(node_id, child_id)
+                            child_id = tracer.new_node()
+                            child_edge = (node_id, f"Col {col} (re-search)")
+                        score, _, _ = self._pvs(board, depth - 1, -beta, -child_alpha, opponent, child_id, child_edge)
+                        score = -score
+            finally:
+                board.undo_move(col)
+
+            if score > value or (tie_break and score == value):
+                value = score
+                best_col = col
+                best_child_id = child_id
+            alpha = max(alpha, value)
+
+            if tracer is not None:
+                tracer.update_node(node_id, kind, depth, sign * value, *self._traced_window(sign, alpha, beta))
+
+            if alpha >= beta:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                if orderer is not None:
+                    orderer.record_cutoff(col, ply, depth, player)
+                if tracer is not None:
+                    tracer.mark_pruned(node_id, child_id)
+                break
+
+        if tt is not None:
+            if value <= alpha_orig:
+                flag = UPPER_BOUND
+            elif value >= beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            if sign < 0:
+                flag = _SWAPPED_FLAG[flag]
+            stored_col = board.canonical_move(best_col)
+            tt.store(key, depth, sign * value, flag, stored_col)
+            if store is not None:
+                store.record(key, depth, sign * value, flag, stored_col, self.computer_player)
+
+        return value, best_col, best_child_id
+
+    @staticmethod
+    def _traced_window(sign, alpha, beta):
+        """A pvs (alpha, beta) window from the computer's point of view, as traces show it."""
+        return (alpha, beta) if sign > 0 else (-beta, -alpha)
+
+    @staticmethod
+    def _unique_moves(board, moves):
+        """
+        moves without the mirror images of others when the position is its own
+        mirror image: those lead to mirrored positions with the same value. The
+        lower column of each pair is kept, so ties still resolve toward it.
+        """
+        if not board.is_symmetric():
+            return moves
+        return [col for col in moves if 2 * col <= board.cols - 1]
+
+    def _batch_leaf_values(self, board, moves, player):
+        """Values of the depth-0 positions reached by each of moves, scored in one BatchEvaluator call."""
+        evaluator = self.batch_evaluator
+        snapshots = []
+        full = []
+        for col in moves:
+            board.make_move(col, player)
+            snapshots.append(evaluator.snapshot(board))
+            full.append(board.is_board_full())
+            board.undo_move(col)
+        self.nodes += len(moves)
+        self.ply_nodes[self._root_depth] += len(moves)  # The leaves are all at depth 0
+        self.terminal_evaluations += sum(full)
+        self.leaf_evaluations += len(moves) - sum(full)
+
+        scores, fours_1, fours_2 = evaluator.evaluate_snapshots(snapshots, self.computer_player)
+        values = scores.tolist()
+        if any(full):
+            fours = (None, fours_1.tolist(), fours_2.tolist())
+            for index, is_full in enumerate(full):
+                if is_full:
+                    values[index] = fours[self.computer_player][index] - fours[self.human_player][index]
+        return values
+
+    # --- Expected Minimax Search ---
+    def _expected_minimax(self, board, depth, maximizing_player, node_id=None, edge=None):
+        tracer = self.tracer
+        self.nodes += 1
+        if not self.nodes & self.DEADLINE_CHECK_MASK:
+            self._check_deadline()
+        self.ply_nodes[self._root_depth - depth] += 1
+
+        score = self.leaf_value(board, depth)
+        if score is not None:
+            if tracer is not None:
+                tracer.add_node(node_id, 'terminal' if board.is_board_full() else 'heuristic', depth, edge, value=score)
+            return score, None, node_id
+
+        # Cache lookup (needs a board with a Zobrist hash, i.e. BitBoard). The
+        # root is always searched so its move does not depend on earlier searches.
+        cache = self.expectimax_cache
+        if cache is not None:
+            key = (board.key, depth, maximizing_player)
+            entry = cache.probe(key) if depth < self._root_depth else None
+            # expected_minimax_star stores bounds in the same cache; only exact values answer here
+            if entry is not None and entry[1] == EXACT:
+                if tracer is not None:
+                    tracer.add_node(node_id, 'tt', depth, edge, value=entry[0])
+                return entry[0], board.canonical_move(entry[2]), node_id
+
+        if depth == 1 and self.batch_evaluator is not None and tracer is None:
+            result = self._expected_batched_frontier(board, maximizing_player)
+            if cache is not None:
+                cache.store(key, result[0], EXACT, board.canonical_move(result[1]))
+            return result
+
+        kind = 'max' if maximizing_player else 'min'
+        if tracer is not None:
+            tracer.add_node(node_id, kind, depth, edge)
+
+        valid_moves = self._unique_moves(board, board.get_valid_moves())
+        best_col = valid_moves[0]
         value = -float('inf') if maximizing_player else float('inf')
         best_child_id = None
+        child_id = child_edge = None
 
         if maximizing_player:
             for col in valid_moves:
-                chance_id = self._get_next_node_id()
-                
                 # Chance Node Setup
-                dot.node(chance_id, label=f"CHANCE\nEV: {0.0:.2f}", style='filled', fillcolor='#8be9fd', shape='diamond', fontcolor='#282a36') # Light blue, black font
-                dot.edge(current_node_id, chance_id, label=f"Col {col}", color='#bd93f9', penwidth='2') # Purple edge
+                if tracer is not None:
+                    child_id = tracer.new_node()
+                    tracer.add_node(child_id, 'chance', depth, (node_id, f"Col {col}"), value=0.0)
 
                 # Calculate Expected Value
-                expected_score, _, child_path_id = self._calculate_chance_value(board, depth - 1, col, dot, chance_id)
-                score = expected_score
-                
+                score = self._calculate_chance_value(board, depth - 1, col, child_id)
+
                 if score > value:
                     value = score
                     best_col = col
-                    best_child_id = chance_id
+                    best_child_id = child_id
 
-                dot.node(current_node_id, label=f"MAX\nD={depth}\nValue: {value:.2f}", style='filled', fillcolor='#50fa7b', shape='ellipse', fontcolor='#282a36')
-            
-            return value, best_col, best_child_id
+                if tracer is not None:
+                    tracer.update_node(node_id, kind, depth, value)
 
         else: # Minimizing Player
+            best_col = None
             for col in valid_moves:
-                child_id = self._get_next_node_id()
-                row, played_col = self._simulate_move(board, col, self.human_player)
-                
-                score, _, child_path_id = self._expected_minimax_graph(board, depth - 1, True, dot, child_id, (current_node_id, f"Col {col}"), None)
-                
-                self._undo_move(board, row, played_col)
-                
+                if tracer is not None:
+                    child_id = tracer.new_node()
+                    child_edge = (node_id, f"Col {col}")
+
+                board.make_move(col, self.human_player)
+                try:
+                    score, _, _ = self._expected_minimax(board, depth - 1, True, child_id, child_edge)
+                finally:
+                    board.undo_move(col)
+
                 if score < value:
                     value = score
-                    best_child_id = child_path_id
+                    best_child_id = child_id
+
+                if tracer is not None:
+                    tracer.update_node(node_id, kind, depth, value)
 
-                dot.node(current_node_id, label=f"MIN\nD={depth}\nValue: {value:.2f}", style='filled', fillcolor='#ff5555', shape='ellipse', fontcolor='#f8f8f2')
+        if cache is not None:
+            cache.store(key, value, EXACT, board.canonical_move(best_col))
+
+        return value, best_col, best_child_id
 
-            return value, None, best_child_id
-            
-    def _calculate_chance_value(self, board, depth, chosen_col, dot, parent_id):
-        """Calculates EV and recursively calls graph generation for child nodes."""
+    def _expected_batched_frontier(self, board, maximizing_player):
+        """_expected_minimax for a depth-1 node, with every leaf below it scored in one batch."""
+        valid_moves = board.get_valid_moves()
+        if not maximizing_player:
+            return min(self._batch_leaf_values(board, valid_moves, self.human_player)), None, None
+
+        # Each landing column is scored once even though up to three chance nodes share it
+        leaf_values = dict(zip(valid_moves, self._batch_leaf_values(board, valid_moves, self.computer_player)))
+        best_col = valid_moves[0]
+        value = -float('inf')
+        for col in valid_moves:
+            expected_value = 0
+            for offset, prob in CHANCE_OUTCOMES:
+                expected_value += prob * leaf_values.get(col + offset, 0)
+            if expected_value > value:
+                value = expected_value
+                best_col = col
+        return value, best_col, None
+
+    def _calculate_chance_value(self, board, depth, chosen_col, node_id=None):
+        """Expected value of choosing chosen_col when the piece may slip into a neighbouring column."""
+        tracer = self.tracer
         expected_value = 0
-        
-        moves = [
-            (chosen_col, 0.6, 'P=0.6'),
-            (chosen_col - 1, 0.2, 'P=0.2'),
-            (chosen_col + 1, 0.2, 'P=0.2')
-        ]
-        
+        child_id = child_edge = None
+
+        for offset, prob in CHANCE_OUTCOMES:
+            col = chosen_col + offset
+            if tracer is not None:
+                child_id = tracer.new_node()
+                child_edge = (node_id, f"P={prob}")
+
+            if board.is_valid_move(col):
+                board.make_move(col, self.computer_player)
+                try:
+                    score, _, _ = self._expected_minimax(board, depth, False, child_id, child_edge)
+                finally:
+                    board.undo_move(col)
+            else:
+                score = 0
+                if tracer is not None:
+                    tracer.add_node(child_id, 'blocked', depth, child_edge, value=0)
+
+            expected_value += prob * score
+
+        if tracer is not None:
+            tracer.update_node(node_id, 'chance', depth, expected_value)
+
+        return expected_value
+
+    # --- Expected Minimax Search with Star1/Star2 Pruning ---
+    def _value_bounds(self, board):
+        """(lower, upper) bounds on the value of every leaf below board."""
+        complete = window_weights(board.connect)[-1]
+        if hasattr(board, 'count_open_windows'):
+            # Only windows free of the opponent's pieces can still score for a player
+            return (-complete * board.count_open_windows(self.human_player),
+                    complete * board.count_open_windows(self.computer_player))
+        bound = complete * len(window_tables(board.rows, board.cols, board.connect)[0])
+        return -bound, bound
+
+    def _star_expected_minimax(self, board, depth, alpha, beta, maximizing_player, node_id=None, edge=None):
+        """
+        _expected_minimax searched with an (alpha, beta) window. A value strictly
+        inside the window is exact; otherwise the returned value is a bound on
+        the side it fell (at most alpha or at least beta), which is all the
+        parent needs. With a full window it returns the exhaustive value and move.
+        """
+        tracer = self.tracer
+        self.nodes += 1
+        if not self.nodes & self.DEADLINE_CHECK_MASK:
+            self._check_deadline()
+        self.ply_nodes[self._root_depth - depth] += 1
+
+        score = self.leaf_value(board, depth)
+        if score is not None:
+            if tracer is not None:
+                tracer.add_node(node_id, 'terminal' if board.is_board_full() else 'heuristic', depth, edge, value=score)
+            return score, None, node_id
+
+        cache = self.expectimax_cache
+        if cache is not None:
+            key = (board.key, depth, maximizing_player)
+            entry = cache.probe(key) if depth < self._root_depth else None
+            if entry is not None:
+                cached_value, flag = entry[0], entry[1]
+                if flag == EXACT or (flag == LOWER_BOUND and cached_value >= beta) or (flag == UPPER_BOUND and cached_value <= alpha):
+                    if tracer is not None:
+                        tracer.add_node(node_id, 'tt', depth, edge, value=cached_value)
+                    return cached_value, board.canonical_move(entry[2]), node_id
+            alpha_orig, beta_orig = alpha, beta
+
+        kind = 'max' if maximizing_player else 'min'
+        if tracer is not None:
+            tracer.add_node(node_id, kind, depth, edge, alpha=alpha, beta=beta)
+
+        valid_moves = self._unique_moves(board, board.get_valid_moves())
+        best_col = valid_moves[0]
+        value = -float('inf') if maximizing_player else float('inf')
         best_child_id = None
+        child_id = child_edge = None
+
+        for index, col in enumerate(valid_moves):
+            if maximizing_player:
+                if tracer is not None:
+                    child_id = tracer.new_node()
+                    tracer.add_node(child_id, 'chance', depth, (node_id, f"Col {col}"), value=0.0)
+                # Only a strictly better expected value changes the move, as in _expected_minimax
+                score = self._star_chance_value(board, depth - 1, col, max(alpha, value), beta, child_id)
+                if score > value:
+                    value = score
+                    best_col = col
+                    best_child_id = child_id
+                cut = value >= beta
+            else: # Minimizing Player
+                if tracer is not None:
+                    child_id = tracer.new_node()
+                    child_edge = (node_id, f"Col {col}")
+                board.make_move(col, self.human_player)
+                try:
+                    score, _, _ = self._star_expected_minimax(board, depth - 1, alpha, min(beta, value), True, child_id, child_edge)
+                finally:
+                    board.undo_move(col)
+                if score < value:
+                    value = score
+                    best_child_id = child_id
+                cut = value <= alpha
 
-        for col_idx, prob, label in moves:
-            score = 0
-            child_id = self._get_next_node_id()
-            
-            if 0 <= col_idx < board.cols and board.is_valid_move(col_idx):
-                row, played_col = self._simulate_move(board, col_idx, self.computer_player)
-                score, _, child_path_id = self._expected_minimax_graph(board, depth, False, dot, child_id, (parent_id, label), True)
-                self._undo_move(board, row, played_col)
-                
+            if tracer is not None:
+                if maximizing_player:
+                    tracer.update_node(node_id, kind, depth, value, max(alpha, value), beta)
+                else:
+                    tracer.update_node(node_id, kind, depth, value, alpha, min(beta, value))
+
+            if cut:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                if tracer is not None:
+                    tracer.mark_pruned(node_id, child_id)
+                break
+
+        if not maximizing_player:
+            best_col = None
+        if cache is not None:
+            if alpha_orig < value < beta_orig:
+                flag = EXACT
+            elif value <= alpha_orig:
+                flag = UPPER_BOUND
             else:
-                score = 0 
-                dot.node(child_id, label="BLOCKED\nValue: 0.00", style='filled', fillcolor='grey', shape='box', fontcolor='#282a36')
-                dot.edge(parent_id, child_id, label=label, color='grey', style='dotted', penwidth='1')
-                child_path_id = child_id
+                flag = LOWER_BOUND
+            cache.store(key, value, flag, board.canonical_move(best_col))
+
+        return value, best_col, best_child_id
+
+    def _star_chance_value(self, board, depth, chosen_col, alpha, beta, node_id=None):
+        """
+        _calculate_chance_value searched with an (alpha, beta) window.
+
+        Every outcome value lies within _value_bounds(board), so the outcomes
+        searched so far bracket the expected value. Star2 first probes one reply
+        of each outcome for a cheap upper bound on it; Star1 then searches each
+        outcome with the window that can still move the bracket across (alpha,
+        beta), and returns the bracket edge as soon as it cannot.
+        """
+        tracer = self.tracer
+        epsilon = self.STAR_EPSILON
+        lower, upper = self._value_bounds(board)
+        cols = [chosen_col + offset for offset, _ in CHANCE_OUTCOMES]
+        probs = [prob for _, prob in CHANCE_OUTCOMES]
+        # Searched (or blocked) outcome values, and upper bounds for the rest
+        values = [None if board.is_valid_move(col) else 0 for col in cols]
+        uppers = [upper] * len(cols)
+
+        def bracket(skip=None):
+            """(lowest, highest) expected value over the outcomes other than skip."""
+            low = high = 0
+            for index, prob in enumerate(probs):
+                if index == skip:
+                    continue
+                if values[index] is not None:
+                    low += prob * values[index]
+                    high += prob * values[index]
+                else:
+                    low += prob * lower
+                    high += prob * uppers[index]
+            return low, high
 
+        # Star2 probing: an outcome is a MIN node, worth at most any one of its replies
+        if depth > 0:
+            for index, col in enumerate(cols):
+                if values[index] is not None:
+                    continue
+                board.make_move(col, self.computer_player)
+                try:
+                    if not board.is_board_full():
+                        _, high = bracket(index)
+                        probe_alpha = (alpha - high) / probs[index] - epsilon
+                        replies = board.get_valid_moves()
+                        reply = min(replies, key=lambda reply_col: abs(2 * reply_col - (board.cols - 1)))
+                        board.make_move(reply, self.human_player)
+                        self.tracer = None  # Probes are not part of the traced tree
+                        try:
+                            probe = self._star_expected_minimax(board, depth - 1, probe_alpha, float('inf'), True)[0]
+                        finally:
+                            self.tracer = tracer
+                            board.undo_move(reply)
+                        uppers[index] = min(uppers[index], probe)
+                finally:
+                    board.undo_move(col)
+
+        # Star1 search
+        child_id = child_edge = last_child_id = None
+        for index, col in enumerate(cols):
+            prob = probs[index]
+            if tracer is not None:
+                child_edge = (node_id, f"P={prob}")
+            if values[index] is not None:
+                if tracer is not None:
+                    last_child_id = tracer.new_node()
+                    tracer.add_node(last_child_id, 'blocked', depth, child_edge, value=0)
+                continue
+
+            bound = None
+            low, high = bracket()
+            if high < alpha - epsilon:
+                bound = high
+            elif low > beta + epsilon:
+                bound = low
+            else:
+                low, high = bracket(index)
+                child_alpha = (alpha - high) / prob - epsilon
+                child_beta = (beta - low) / prob + epsilon
+                if tracer is not None:
+                    child_id = last_child_id = tracer.new_node()
+                board.make_move(col, self.computer_player)
+                try:
+                    score, _, _ = self._star_expected_minimax(board, depth, child_alpha, child_beta, False, child_id, child_edge)
+                finally:
+                    board.undo_move(col)
+                values[index] = score
+                if score <= child_alpha:
+                    bound = high + prob * score
+                elif score >= child_beta:
+                    bound = low + prob * score
+
+            if bound is not None:
+                self.cutoffs += 1
+                if tracer is not None:
+                    if last_child_id is not None:
+                        tracer.mark_pruned(node_id, last_child_id)
+                    tracer.update_node(node_id, 'chance', depth, bound)
+                return bound
+
+        # Summed in outcome order so the value is bit-identical to _calculate_chance_value
+        expected_value = 0
+        for prob, score in zip(probs, values):
             expected_value += prob * score
-            
-        dot.node(parent_id, label=f"CHANCE\nEV: {expected_value:.2f}", style='filled', fillcolor='#8be9fd', shape='diamond', fontcolor='#282a36')
-        
-        return expected_value, None, best_child_id
\ No newline at end of file
+
+        if tracer is not None:
+            tracer.update_node(node_id, 'chance', depth, expected_value)
+
+        return expected_value
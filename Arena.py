@@ -0,0 +1,197 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from EndgameSolver import EndgameSolver
+from EvaluationStore import EvaluationStore
+from ExpectimaxCache import ExpectimaxCache
+from MoveOrdering import MoveOrderer
+from OpeningBook import OpeningBook
+from TranspositionTable import TranspositionTable
+
+# Feature toggles of an agent spec and their defaults
+FEATURES = {'tt': True, 'ordering': True, 'cache': True, 'endgame': False, 'book': False, 'store': False}
+
+
+def parse_agent_spec(spec):
+    """
+    Parse 'algorithm[:key=value,...]', e.g. 'minimax_ab:depth=6,time=0.5,endgame=on'.
+    Keys are depth, time (seconds per move) and the on/off FEATURES.
+    """
+    algorithm, _, options = spec.partition(":")
+    if algorithm not in AIAgent.ALGORITHMS:
+        raise ValueError(f"Unknown algorithm in agent spec: {spec}")
+    config = {'name': spec, 'algorithm': algorithm, 'depth': 4, 'time_limit': None}
+    config.update(FEATURES)
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key == 'depth':
+            config['depth'] = int(value)
+        elif key == 'time':
+            config['time_limit'] = float(value)
+        elif key in FEATURES:
+            if value not in ('on', 'off'):
+                raise ValueError(f"{key} must be 'on' or 'off' in agent spec: {spec}")
+            config[key] = value == 'on'
+        else:
+            raise ValueError(f"Unknown option '{key}' in agent spec: {spec}")
+    return config
+
+
+def build_agent(config, player, cols=7, evaluation_store=None):
+    """A fresh AIAgent for player with the features switched on in config (evaluation_store if 'store' is on)."""
+    return AIAgent(player, 3 - player, config['depth'],
+                   transposition_table=TranspositionTable(1 << 18) if config['tt'] else None,
+                   move_orderer=MoveOrderer(cols) if config['ordering'] else None,
+                   expectimax_cache=ExpectimaxCache() if config['cache'] else None,
+                   endgame_solver=EndgameSolver() if config['endgame'] else None,
+                   opening_book=OpeningBook.load(config['algorithm']) if config['book'] else None,
+                   evaluation_store=evaluation_store if config['store'] else None)
+
+
+def random_openings(count, plies, seed, rows=6, cols=7):
+    """count distinct random move sequences of the given length (fewer if there are not enough)."""
+    rng = random.Random(seed)
+    openings = set()
+    for _ in range(count * 20):
+        if len(openings) == count:
+            break
+        board = BitBoard(rows, cols)
+        sequence = []
+        for _ in range(plies):
+            col = rng.choice(board.get_valid_moves())
+            board.play_at_column(col)
+            sequence.append(col)
+        openings.add(tuple(sequence))
+    return sorted(openings)
+
+
+def play_game(task):
+    """
+    Play one game from an opening. task is (first, second, opening): the
+    configs playing player 1 and player 2. Returns the final connected-four
+    difference for player 1 and per-player [moves, seconds, nodes] totals.
+    """
+    first, second, opening = task
+    board = BitBoard()
+    for col in opening:
+        board.play_at_column(col)
+    # One store per game process; it is shared with the other games through its file
+    store = EvaluationStore() if first['store'] or second['store'] else None
+    agents = {1: build_agent(first, 1, evaluation_store=store), 2: build_agent(second, 2, evaluation_store=store)}
+    configs = {1: first, 2: second}
+    usage = {1: [0, 0.0, 0], 2: [0, 0.0, 0]}
+
+    while not board.game_over:
+        player = board.current_player
+        agent = agents[player]
+        start_time = time.perf_counter()
+        col = agent.get_best_move(board, configs[player]['algorithm'], configs[player]['time_limit'])
+        usage[player][0] += 1
+        usage[player][1] += time.perf_counter() - start_time
+        usage[player][2] += agent.nodes
+        board.play_at_column(col)
+
+    if store is not None:
+        store.close()
+    return board.count_connected_fours(1) - board.count_connected_fours(2), usage[1], usage[2]
+
+
+def elo_estimate(wins, draws, losses):
+    """(Elo difference, low, high) from a win/draw/loss record; low..high is a 95% confidence interval."""
+    games = wins + draws + losses
+    if not games:
+        return 0.0, -float('inf'), float('inf')
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(fraction):
+        if fraction <= 0:
+            return -float('inf')
+        if fraction >= 1:
+            return float('inf')
+        return -400 * math.log10(1 / fraction - 1)
+
+    return elo(score), elo(score - margin), elo(score + margin)
+
+
+def run_match(config_a, config_b, games, opening_plies, seed, executor):
+    """
+    Play config_a against config_b; every opening is played once with each
+    colour. If there are fewer distinct openings of opening_plies moves than
+    games need, fewer games are played: the result has both counts.
+    """
+    wanted = (games + 1) // 2
+    openings = random_openings(wanted, opening_plies, seed)
+    if len(openings) < wanted:
+        print(f"  warning: only {len(openings)} distinct {opening_plies}-ply openings, playing "
+              f"{2 * len(openings)} of {2 * wanted} games; raise --opening-plies for more")
+    tasks = []
+    for opening in openings:
+        tasks.append((config_a, config_b, opening))
+        tasks.append((config_b, config_a, opening))
+
+    record = {'wins': 0, 'draws': 0, 'losses': 0}
+    usage = {'a': [0, 0.0, 0], 'b': [0, 0.0, 0]}
+    futures = {executor.submit(play_game, task): task[0] is config_a for task in tasks}
+    for done, future in enumerate(as_completed(futures), 1):
+        diff, usage_1, usage_2 = future.result()
+        a_first = futures[future]
+        a_diff = diff if a_first else -diff
+        record['wins' if a_diff > 0 else 'draws' if a_diff == 0 else 'losses'] += 1
+        for side, totals in (('a', usage_1 if a_first else usage_2), ('b', usage_2 if a_first else usage_1)):
+            usage[side] = [total + value for total, value in zip(usage[side], totals)]
+        if done % 100 == 0:
+            print(f"  {done}/{len(tasks)} games")
+
+    elo, low, high = elo_estimate(record['wins'], record['draws'], record['losses'])
+    result = {'a': config_a['name'], 'b': config_b['name'], 'games': len(tasks), 'games_requested': 2 * wanted, **record,
+              'elo': elo, 'elo_low': low, 'elo_high': high}
+    for side, (moves, seconds, nodes) in usage.items():
+        result[f'{side}_move_latency'] = seconds / moves if moves else 0.0
+        result[f'{side}_nodes_per_second'] = nodes / seconds if seconds > 0 else 0.0
+    return result
+
+
+def print_result(result):
+    requested = f" (of {result['games_requested']} requested)" if result['games'] < result['games_requested'] else ""
+    print(f"{result['a']} vs {result['b']}: {result['games']} games{requested}, "
+          f"+{result['wins']} ={result['draws']} -{result['losses']}, "
+          f"Elo {result['elo']:+.0f} (95% CI {result['elo_low']:+.0f} to {result['elo_high']:+.0f})")
+    for side in ('a', 'b'):
+        print(f"  {result[side]}: {result[f'{side}_move_latency'] * 1000:.1f} ms/move, "
+              f"{result[f'{side}_nodes_per_second']:,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless self-play between agent configurations")
+    parser.add_argument("agents", nargs="+", help="agent specs, e.g. minimax_ab:depth=6 expected_minimax_star:depth=4,cache=off")
+    parser.add_argument("--games", type=int, default=200, help="games per pairing (rounded up to even)")
+    parser.add_argument("--opening-plies", type=int, default=4,
+                        help="random moves before the agents take over (7^plies distinct openings at most)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+    if len(args.agents) < 2:
+        parser.error("at least two agent specs are needed")
+
+    configs = [parse_agent_spec(spec) for spec in args.agents]
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for config_a, config_b in itertools.combinations(configs, 2):
+            result = run_match(config_a, config_b, args.games, args.opening_plies, args.seed, executor)
+            print_result(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
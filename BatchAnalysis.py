@@ -0,0 +1,206 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from EndgameSolver import EndgameSolver
+from ExpectimaxCache import ExpectimaxCache
+from MoveOrdering import MoveOrderer
+from TranspositionTable import TranspositionTable
+
+
+def parse_position(line, number, defaults):
+    """
+    Parse one input line into (id, board, settings).
+
+    A JSON line is an object with 'moves' (a digit string or a list of columns
+    played from the empty board) or 'state' (column-major cells as returned by
+    get_board_state, with an optional 'player' to move), and optionally 'id',
+    'rows', 'cols', 'connect', 'algorithm', 'depth' and 'time_limit' overriding
+    the defaults. Any other line is compact: '[id<whitespace>]moves', moves as
+    digits or comma-separated columns. Lines without an id are tagged with
+    their line number.
+    """
+    settings = dict(defaults)
+    line = line.strip()
+    if line.startswith("{"):
+        record = json.loads(line)
+        position_id = record.get('id', number)
+        for key in ('rows', 'cols', 'connect', 'algorithm', 'depth', 'time_limit'):
+            if key in record:
+                settings[key] = record[key]
+        moves, state = record.get('moves'), record.get('state')
+    else:
+        fields = line.split()
+        position_id = fields[0] if len(fields) > 1 else number
+        moves, state = fields[-1] if fields else "", None
+
+    if settings['algorithm'] not in AIAgent.ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {settings['algorithm']}")
+    for key in ('depth', 'rows', 'cols', 'connect'):
+        if not isinstance(settings[key], int) or isinstance(settings[key], bool) or settings[key] < 1:
+            raise ValueError(f"{key} must be a positive integer, not {settings[key]!r}")
+    time_limit = settings['time_limit']
+    if time_limit is not None and (not isinstance(time_limit, (int, float)) or isinstance(time_limit, bool)
+                                   or time_limit <= 0):
+        raise ValueError(f"time_limit must be a positive number, not {time_limit!r}")
+    if state is not None:
+        board = BitBoard.from_board_state(state, record.get('player'), settings['connect'])
+    else:
+        if isinstance(moves, str):
+            moves = moves.split(",") if "," in moves else list(moves)
+        board = BitBoard(settings['rows'], settings['cols'], settings['connect'])
+        for col in moves or ():
+            if board.play_at_column(int(col)) is None:
+                raise ValueError(f"Illegal move {col} after {board.moves_played} moves")
+    return position_id, board, settings
+
+
+def analyze_position(line, number, defaults, endgame=False):
+    """
+    Best move and score of one input line as an output record. A line that
+    cannot be read or searched gives an 'error' record tagged with its line
+    number and id, so one bad line never stops the stream.
+    """
+    try:
+        return _analyze(line, number, defaults, endgame)
+    except Exception as error:
+        return {'id': _line_id(line, number), 'line': number, 'error': str(error) or type(error).__name__}
+
+
+def _line_id(line, number):
+    """The id parse_position gives line, as far as it can be read."""
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return number
+        return record.get('id', number) if isinstance(record, dict) else number
+    fields = line.split()
+    return fields[0] if len(fields) > 1 else number
+
+
+def _analyze(line, number, defaults, endgame):
+    """analyze_position without the error handling."""
+    position_id, board, settings = parse_position(line, number, defaults)
+    player = board.current_player
+    if board.is_board_full():
+        score = board.count_connected_fours(player) - board.count_connected_fours(3 - player)
+        return {'id': position_id, 'move': None, 'score': score, 'player': player}
+
+    agent = AIAgent(player, 3 - player, settings['depth'], transposition_table=TranspositionTable(1 << 16),
+                    move_orderer=MoveOrderer(board.cols), expectimax_cache=ExpectimaxCache(1 << 16),
+                    endgame_solver=EndgameSolver() if endgame else None)
+    move = agent.get_best_move(board, settings['algorithm'], settings['time_limit'])
+    stats = agent.get_search_stats()
+    return {'id': position_id, 'move': move, 'score': agent.last_value, 'player': player,
+            'algorithm': settings['algorithm'], 'depth': stats.depth, 'source': stats.source,
+            'nodes': stats.nodes, 'elapsed': round(stats.elapsed, 6)}
+
+
+def _analyze_chunk(task):
+    """Worker entry point: ([(line number, line), ...], defaults, endgame) -> list of JSON output lines."""
+    numbered_lines, defaults, endgame = task
+    return [json.dumps(analyze_position(line, number, defaults, endgame)) for number, line in numbered_lines]
+
+
+def _chunks(lines, size):
+    """Lists of (line number, line) for the non-blank input lines, read lazily."""
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_stream(lines, output, defaults, workers=None, chunk_size=16, max_in_flight=None, ordered=True,
+                   endgame=False):
+    """
+    Analyse every line of the iterable lines and write one JSON result per line
+    to output. Lines go to a process pool in chunks; at most max_in_flight
+    chunks are submitted but not yet written, so memory stays flat however
+    long the input is. With ordered results follow input order, otherwise they
+    are written as they complete (each carries its id). Returns the number of
+    results written.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 4 * workers
+    chunks = _chunks(lines, chunk_size)
+    pending = {}  # future -> chunk sequence number
+    finished = {}  # sequence number -> output lines waiting for earlier chunks (ordered only)
+    next_to_write = 0
+    written = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        submitted = 0
+        exhausted = False
+        while True:
+            # Chunks held back for ordering count against the limit too
+            while not exhausted and len(pending) + len(finished) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                future = executor.submit(_analyze_chunk, (chunk, defaults, endgame))
+                pending[future] = submitted
+                submitted += 1
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                sequence = pending.pop(future)
+                results = future.result()
+                if ordered:
+                    finished[sequence] = results
+                else:
+                    output.write("".join(result + "\n" for result in results))
+                    written += len(results)
+            while next_to_write in finished:
+                results = finished.pop(next_to_write)
+                output.write("".join(result + "\n" for result in results))
+                written += len(results)
+                next_to_write += 1
+            output.flush()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Best moves and scores for a stream of positions (JSONL or compact lines)")
+    parser.add_argument("input", nargs="?", default="-", help="input file, '-' for stdin")
+    parser.add_argument("--output", default="-", help="output JSONL file, '-' for stdout")
+    parser.add_argument("--algorithm", default="minimax_ab", choices=AIAgent.ALGORITHMS)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per position (iterative deepening)")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4)
+    parser.add_argument("--endgame", action="store_true", help="solve positions with few empty cells exactly")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=16, help="positions sent to a worker at a time")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="chunks submitted but not yet written")
+    parser.add_argument("--unordered", action="store_true", help="write results as they complete")
+    args = parser.parse_args()
+
+    defaults = {'algorithm': args.algorithm, 'depth': args.depth, 'time_limit': args.time_limit,
+                'rows': args.rows, 'cols': args.cols, 'connect': args.connect}
+    source = sys.stdin if args.input == "-" else open(args.input)
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    start_time = time.perf_counter()
+    try:
+        count = analyze_stream(source, target, defaults, args.workers, args.chunk_size, args.max_in_flight,
+                               not args.unordered, args.endgame)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"Analysed {count} positions in {elapsed:.1f}s ({count / elapsed if elapsed > 0 else 0:.1f}/s)", file=sys.stderr)
@@ -0,0 +1,81 @@
+import numpy as np
+
+from BitBoard import window_tables, window_weights
+
+
+class BatchEvaluator:
+    """
+    Scores many positions at once with NumPy.
+
+    evaluate() takes an (N, cols, rows) int8 array laid out like
+    get_board_state() (0 empty, 1 and 2 for the players) and returns the same
+    heuristic and connected-four counts as ConnectFourBoard, for all N boards in
+    a handful of array operations. The window cell indexes and the per-window
+    score table are precomputed once per board size and connect length.
+    """
+
+    def __init__(self, rows=6, cols=7, connect=4):
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        windows, _ = window_tables(rows, cols, connect)
+        height = rows + 1
+        # Window cells as flat indexes into a (cols, rows) board
+        self.window_cells = np.array([[(cell // height) * rows + cell % height for cell in window] for window in windows],
+                                     dtype=np.intp).reshape(-1, connect)
+        # Bit position of every (col, row) cell in a BitBoard mask, in (cols, rows) order
+        self.mask_shifts = np.array([col * height + row for col in range(cols) for row in range(rows)], dtype=np.uint64)
+
+        # score_table[own * stride + opponent]: window value for the owner of own pieces
+        weights = window_weights(connect)
+        stride = connect + 1
+        score = np.zeros(stride * stride, dtype=np.int64)
+        for own in range(stride):
+            for opponent in range(stride):
+                if own and not opponent:
+                    score[own * stride + opponent] = weights[own]
+                elif opponent and not own:
+                    score[own * stride + opponent] = -weights[opponent]
+        self.score_table = score
+        self._stride = stride
+        # Masks of boards with more than 64 bit positions do not fit a uint64
+        self._fits_uint64 = cols * height <= 64
+
+    def evaluate(self, boards, player):
+        """
+        Returns (scores, fours_1, fours_2) for an (N, cols, rows) array: the
+        heuristic for player and the connected-four counts of players 1 and 2.
+        """
+        boards = np.asarray(boards, dtype=np.int8)
+        cells = boards.reshape(len(boards), -1)[:, self.window_cells]  # (N, windows, connect)
+        counts_1 = (cells == 1).sum(axis=2)
+        counts_2 = (cells == 2).sum(axis=2)
+
+        if player == 1:
+            scores = self.score_table[counts_1 * self._stride + counts_2].sum(axis=1)
+        else:
+            scores = self.score_table[counts_2 * self._stride + counts_1].sum(axis=1)
+        return scores, (counts_1 == self.connect).sum(axis=1), (counts_2 == self.connect).sum(axis=1)
+
+    def masks_to_boards(self, masks_1, masks_2):
+        """Build the (N, cols, rows) array from BitBoard masks of players 1 and 2."""
+        masks_1 = np.array(masks_1, dtype=np.uint64)[:, None]
+        masks_2 = np.array(masks_2, dtype=np.uint64)[:, None]
+        one = np.uint64(1)
+        boards = ((masks_1 >> self.mask_shifts) & one) + 2 * ((masks_2 >> self.mask_shifts) & one)
+        return boards.astype(np.int8).reshape(-1, self.cols, self.rows)
+
+    def snapshot(self, board):
+        """A cheap copy of board's pieces for evaluate_snapshots()."""
+        if hasattr(board, 'masks') and self._fits_uint64:
+            return (board.masks[1], board.masks[2])
+        return board.get_board_state()
+
+    def evaluate_snapshots(self, snapshots, player):
+        """evaluate() for a list of snapshot() results taken from one kind of board."""
+        if snapshots and isinstance(snapshots[0], tuple):
+            masks_1, masks_2 = zip(*snapshots)
+            boards = self.masks_to_boards(masks_1, masks_2)
+        else:
+            boards = np.array(snapshots, dtype=np.int8)
+        return self.evaluate(boards, player)
@@ -0,0 +1,165 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from ExpectimaxCache import ExpectimaxCache
+from MoveOrdering import MoveOrderer
+from TranspositionTable import TranspositionTable
+
+# Bump CORPUS_VERSION whenever CORPUS changes; results of different versions are not compared
+CORPUS_VERSION = 1
+# Positions as column sequences from the empty board, by game phase
+CORPUS = {
+    'opening': ("", "3", "3324", "332415", "41565323"),
+    'middlegame': ("45412452405661", "5653566514163062", "533055162322612332", "41631105160626426465",
+                   "3402654611321123465123"),
+    'endgame': ("4225536155661214500610135132", "016215342343531602221455250411", "63146122656045435550010416154041",
+                "1346511014064464504051562003132233", "513132253536566134634561114522464002"),
+}
+# Cases faster than this in the baseline are too noisy for wall time comparison
+MIN_TIMED_SECONDS = 0.005
+
+
+def corpus_board(sequence):
+    board = BitBoard()
+    for col in sequence:
+        board.play_at_column(int(col))
+    return board
+
+
+def benchmark_case(algorithm, depth, sequence, repeat=1, memory=True):
+    """
+    Time get_best_move on one corpus position with a fresh agent set up as in
+    the GUI. Wall time is the best of repeat runs; peak memory comes from an
+    extra run under tracemalloc so its overhead does not skew the timing.
+    """
+    def run():
+        board = corpus_board(sequence)
+        player = board.current_player
+        agent = AIAgent(player, 3 - player, depth, transposition_table=TranspositionTable(),
+                        move_orderer=MoveOrderer(board.cols), expectimax_cache=ExpectimaxCache())
+        start_time = time.perf_counter()
+        move = agent.get_best_move(board, algorithm)
+        return move, agent, time.perf_counter() - start_time
+
+    wall_time = float('inf')
+    for _ in range(repeat):
+        move, agent, elapsed = run()
+        wall_time = min(wall_time, elapsed)
+
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'move': move,
+        'value': agent.last_value,
+        'nodes': agent.nodes,
+        'wall_time': wall_time,
+        'nodes_per_second': agent.nodes / wall_time if wall_time > 0 else 0.0,
+        'peak_memory': peak_memory,
+    }
+
+
+def run_suite(algorithms, depths, repeat=1, memory=True):
+    """Benchmark every algorithm and depth over the corpus. Returns the JSON-ready report."""
+    results = []
+    for algorithm in algorithms:
+        for depth in depths:
+            for phase, sequences in CORPUS.items():
+                for sequence in sequences:
+                    result = {'algorithm': algorithm, 'depth': depth, 'phase': phase, 'position': sequence}
+                    result.update(benchmark_case(algorithm, depth, sequence, repeat, memory))
+                    results.append(result)
+                    print(f"{algorithm:>22} d={depth} {phase:>10} {sequence or '(empty)':<36} "
+                          f"{result['nodes']:>10} nodes {result['wall_time']:>8.3f}s")
+    return {
+        'corpus_version': CORPUS_VERSION,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Lines describing every regression of current against baseline: wall time
+    or nodes up by more than threshold (a fraction), or a different move or
+    value for the same case. Nodes, moves and values are deterministic, so
+    any change there comes from the engine, not from timing noise.
+    """
+    if baseline['corpus_version'] != current['corpus_version']:
+        raise ValueError(f"Corpus versions differ: {baseline['corpus_version']} vs {current['corpus_version']}")
+
+    def key(result):
+        return result['algorithm'], result['depth'], result['position']
+
+    baseline_results = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = baseline_results.get(key(result))
+        if before is None:
+            continue
+        name = f"{result['algorithm']} d={result['depth']} {result['phase']} '{result['position']}'"
+        for field in ('wall_time', 'nodes'):
+            if field == 'wall_time' and before[field] < MIN_TIMED_SECONDS:
+                continue
+            if before[field] and result[field] > before[field] * (1 + threshold):
+                regressions.append(f"{name}: {field} {before[field]:.4g} -> {result[field]:.4g} "
+                                   f"(+{result[field] / before[field] - 1:.0%})")
+        if (result['move'], result['value']) != (before['move'], before['value']):
+            regressions.append(f"{name}: move/value {before['move']}/{before['value']} -> {result['move']}/{result['value']}")
+    return regressions
+
+
+def _load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search benchmark over a fixed position corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmark and write a JSON report")
+    run_parser.add_argument("--algorithms", nargs="+", default=list(AIAgent.ALGORITHMS), choices=AIAgent.ALGORITHMS)
+    run_parser.add_argument("--depths", type=int, nargs="+", default=[3, 5])
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    run_parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument("--baseline", help="compare against this report after running")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args.algorithms, args.depths, args.repeat, not args.no_memory)
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}")
+        baseline_path = args.baseline
+    else:
+        report = _load(args.current)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        regressions = compare(_load(baseline_path), report, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        print(f"{len(regressions)} regression(s) against {baseline_path}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,313 @@
+from functools import lru_cache
+from TranspositionTable import zobrist_keys
+
+
+@lru_cache(maxsize=None)
+def window_tables(rows, cols, connect=4):
+    """
+    Precompute the connect-cell windows for a board of the given size.
+    Returns (windows, cell_windows): each window as a tuple of bit indexes, and
+    for every bit index the tuple of window numbers that contain it.
+    """
+    height = rows + 1
+    reach = connect - 1
+    windows = []
+
+    def bit(col, row):
+        return col * height + row
+
+    # Horizontal
+    for row in range(rows):
+        for col in range(cols - reach):
+            windows.append(tuple(bit(col + i, row) for i in range(connect)))
+
+    # Vertical
+    for col in range(cols):
+        for row in range(rows - reach):
+            windows.append(tuple(bit(col, row + i) for i in range(connect)))
+
+    # Diagonal (bottom-left to top-right)
+    for col in range(cols - reach):
+        for row in range(rows - reach):
+            windows.append(tuple(bit(col + i, row + i) for i in range(connect)))
+
+    # Diagonal (bottom-right to top-left)
+    for col in range(reach, cols):
+        for row in range(rows - reach):
+            windows.append(tuple(bit(col - i, row + i) for i in range(connect)))
+
+    cell_windows = [[] for _ in range(cols * height)]
+    for index, window in enumerate(windows):
+        for cell in window:
+            cell_windows[cell].append(index)
+
+    return tuple(windows), tuple(tuple(entry) for entry in cell_windows)
+
+
+@lru_cache(maxsize=None)
+def window_weights(connect=4):
+    """Value of a window by the number of pieces of its owner: 0, 1, 10, 100, ... up to connect."""
+    return (0,) + tuple(10 ** count for count in range(connect))
+
+
+WEIGHTS = window_weights(4)
+
+
+@lru_cache(maxsize=None)
+def mirrored_zobrist_keys(rows, cols):
+    """zobrist_keys(rows, cols) indexed by the mirror image of each cell (column col <-> cols - 1 - col)."""
+    keys = zobrist_keys(rows, cols)
+    height = rows + 1
+    mirror = [(cols - 1 - cell // height) * height + cell % height for cell in range(cols * height)]
+    return (None,
+            tuple(keys[1][cell] for cell in mirror),
+            tuple(keys[2][cell] for cell in mirror))
+
+
+def _window_value(own_count, opponent_count, weights=WEIGHTS):
+    """Heuristic value of one window for the owner of own_count pieces."""
+    # A window holding pieces of both players is blocked (worth 0)
+    if own_count and not opponent_count:
+        return weights[own_count]
+    if opponent_count and not own_count:
+        return -weights[opponent_count]
+    return 0
+
+
+@lru_cache(maxsize=None)
+def gain_table(connect=4):
+    """
+    gain_table(connect)[own][opp]: change in a window's value for the mover when
+    their count in that window goes from own to own + 1 while the opponent holds opp.
+    """
+    weights = window_weights(connect)
+    return tuple(
+        tuple(_window_value(own + 1, opp, weights) - _window_value(own, opp, weights) for opp in range(connect + 1))
+        for own in range(connect)
+    )
+
+
+class BitBoard:
+    """
+    Bitboard position with the same interface as ConnectFourBoard.
+
+    connect is the number of pieces in a row that score (4 for Connect Four).
+    Each player's pieces are stored as one integer mask. Cell (col, row) is bit
+    col * (rows + 1) + row; the spare top bit of every column is always empty.
+
+    hash is the Zobrist hash of the pieces and mirror_hash that of the board
+    reflected left to right. key, the smaller of the two, is the same for a
+    position and its mirror image (which have the same value), so tables keyed
+    by it share entries between them; moves stored with a key go through
+    canonical_move().
+
+    Per-window piece counts, the heuristic total and the connected-four counts
+    are updated on every make_move/undo_move for just the windows touching the
+    played cell, so evaluate_heuristic and count_connected_fours are field reads
+    and a move costs the windows through its cell, not the board area.
+    """
+
+    def __init__(self, rows=6, cols=7, connect=4):
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self._height = rows + 1
+        self._windows, self._cell_windows = window_tables(rows, cols, connect)
+        self._gain = gain_table(connect)
+        self._zobrist = zobrist_keys(rows, cols)
+        self._mirror_zobrist = mirrored_zobrist_keys(rows, cols)
+        self.reset_board()
+
+    @classmethod
+    def from_board_state(cls, state, current_player=None, connect=4):
+        """
+        Build a BitBoard from a column-major state as returned by get_board_state().
+        When current_player is None it is inferred from the piece counts.
+        """
+        board = cls(len(state[0]), len(state), connect)
+        for col, column in enumerate(state):
+            for cell in column:
+                if cell == 0:
+                    break
+                board.make_move(col, cell)
+
+        if current_player is None:
+            current_player = 1 if board.masks[1].bit_count() <= board.masks[2].bit_count() else 2
+        board.current_player = current_player
+        board.game_over = board.is_board_full()
+        return board
+
+    def copy(self):
+        """Independent copy of the position; the precomputed tables are shared."""
+        board = object.__new__(type(self))
+        board.__dict__.update(self.__dict__)
+        board.masks = self.masks[:]
+        board.heights = self.heights[:]
+        board._window_counts = [None, self._window_counts[1][:], self._window_counts[2][:]]
+        board._fours = self._fours[:]
+        board._open = self._open[:]
+        return board
+
+    def reset_board(self):
+        self.masks = [0, 0, 0]  # Indexed by player; slot 0 is unused
+        self.heights = [0] * self.cols
+        self.moves_played = 0
+        self.current_player = 1
+        self.game_over = False
+        # Pieces per window for each player, indexed like masks
+        self._window_counts = [None, [0] * len(self._windows), [0] * len(self._windows)]
+        self._fours = [0, 0, 0]
+        # Windows holding none of the opponent's pieces, i.e. still completable by each player
+        self._open = [0, len(self._windows), len(self._windows)]
+        self._score = 0  # Heuristic total from player 1's point of view
+        self.hash = 0  # Zobrist hash of the pieces, updated on every move
+        self.mirror_hash = 0  # Zobrist hash of the mirrored pieces
+
+    def switch_turns(self):
+        self.current_player = 3 - self.current_player  # Switches between 1 and 2
+
+    def play_at_column(self, col):
+        if not self.is_valid_move(col):
+            return None
+
+        row = self.make_move(col, self.current_player)
+        if self.is_board_full():
+            self.game_over = True
+        else:
+            self.switch_turns()
+
+        return (row, col)
+
+    def make_move(self, col, player):
+        """Drop a piece for player into col without switching turns. Returns the row."""
+        row = self.heights[col]
+        cell = col * self._height + row
+        self.masks[player] |= 1 << cell
+        self.hash ^= self._zobrist[player][cell]
+        self.mirror_hash ^= self._mirror_zobrist[player][cell]
+        self.heights[col] = row + 1
+        self.moves_played += 1
+
+        own = self._window_counts[player]
+        opponent = self._window_counts[3 - player]
+        gain = self._gain
+        complete = self.connect - 1
+        delta = 0
+        closed = 0
+        for window in self._cell_windows[cell]:
+            count = own[window]
+            delta += gain[count][opponent[window]]
+            if count == complete:
+                self._fours[player] += 1
+            elif not count:
+                closed += 1
+            own[window] = count + 1
+        self._score += delta if player == 1 else -delta
+        self._open[3 - player] -= closed
+        return row
+
+    def undo_move(self, col):
+        """Remove the top piece of col (the inverse of make_move)."""
+        row = self.heights[col] - 1
+        cell = col * self._height + row
+        bit = 1 << cell
+        player = 1 if self.masks[1] & bit else 2
+        self.masks[player] ^= bit
+        self.hash ^= self._zobrist[player][cell]
+        self.mirror_hash ^= self._mirror_zobrist[player][cell]
+        self.heights[col] = row
+        self.moves_played -= 1
+
+        own = self._window_counts[player]
+        opponent = self._window_counts[3 - player]
+        gain = self._gain
+        complete = self.connect - 1
+        delta = 0
+        reopened = 0
+        for window in self._cell_windows[cell]:
+            count = own[window] - 1
+            delta += gain[count][opponent[window]]
+            if count == complete:
+                self._fours[player] -= 1
+            elif not count:
+                reopened += 1
+            own[window] = count
+        self._score -= delta if player == 1 else -delta
+        self._open[3 - player] += reopened
+
+    def is_valid_move(self, col):
+        if col < 0 or col >= self.cols:
+            return False
+        return self.heights[col] < self.rows
+
+    def get_valid_moves(self):
+        return [col for col in range(self.cols) if self.heights[col] < self.rows]
+
+    def is_board_full(self):
+        return self.moves_played == self.rows * self.cols
+
+    @property
+    def key(self):
+        """Zobrist key shared by the position and its mirror image."""
+        return min(self.hash, self.mirror_hash)
+
+    def canonical_move(self, col):
+        """
+        col as seen in the orientation key belongs to: mirrored when that is the
+        mirror image of the board. Maps a stored move back the same way; None stays None.
+        """
+        if col is None or self.hash <= self.mirror_hash:
+            return col
+        return self.cols - 1 - col
+
+    def is_symmetric(self):
+        """True when the position is its own mirror image, so mirrored moves are equivalent."""
+        return self.hash == self.mirror_hash
+
+    def count_connected_fours(self, player):
+        """Number of complete windows of player (connected fours unless connect is changed)."""
+        return self._fours[player]
+
+    def count_open_windows(self, player):
+        """Number of windows holding no pieces of player's opponent (never increases as pieces are added)."""
+        return self._open[player]
+
+    def evaluate_heuristic(self, player):
+        """
+        Evaluate board heuristic for the given player
+        Returns: score where positive favors the player, negative favors opponent
+        """
+        return self._score if player == 1 else -self._score
+
+    def get_cell(self, col, row):
+        bit = 1 << (col * self._height + row)
+        if self.masks[1] & bit:
+            return 1
+        if self.masks[2] & bit:
+            return 2
+        return 0
+
+    @property
+    def board(self):
+        """Column-major list view, matching ConnectFourBoard.board (read-only)."""
+        return self.get_board_state()
+
+    def get_board_state(self):
+        return [[self.get_cell(col, row) for row in range(self.rows)] for col in range(self.cols)]
+
+    def print_board(self):
+        """Print the board to console (for debugging)."""
+        print("Current Board:")
+        for row in range(self.rows - 1, -1, -1):  # Print from top to bottom
+            row_str = "|"
+            for col in range(self.cols):
+                cell = self.get_cell(col, row)
+                if cell == 0:
+                    row_str += " |"
+                elif cell == 1:
+                    row_str += "X|"
+                else:
+                    row_str += "O|"
+            print(row_str)
+        print("-" * (self.cols * 2 + 1))
+        print(" " + " ".join(str(i) for i in range(self.cols)))
@@ -0,0 +1,122 @@
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+
+class EndgameSolver:
+    """
+    Exact solver for the last empty cells of a BitBoard game.
+
+    The game ends when the board is full and is scored by the difference in
+    connected fours, so once few cells are left the whole remaining tree is
+    searched: negamax alpha-beta with its own transposition table, hash move
+    and center-out ordering, with mirror-image positions sharing entries and
+    only one of each pair of mirrored moves searched in a symmetric position
+    (BitBoard.key, BitBoard.is_symmetric). A node is also cut when the windows each player
+    can still complete (BitBoard.count_open_windows) bound the final score
+    outside the window. The score is exact, not a heuristic estimate.
+    """
+
+    # Nodes searched between two calls of the check callback
+    CHECK_MASK = 1023
+
+    def __init__(self, threshold=14, transposition_table=None):
+        self.threshold = threshold
+        # Solved values never depend on depth, so entries stay valid for the whole game
+        self.transposition_table = transposition_table if transposition_table is not None else TranspositionTable(1 << 18)
+        self.nodes = 0
+        self.cutoffs = 0
+
+    def applies(self, board):
+        """True for a BitBoard with at most threshold empty cells left."""
+        return hasattr(board, 'count_open_windows') and board.rows * board.cols - board.moves_played <= self.threshold
+
+    def solve(self, board, player, check=None):
+        """
+        Returns (score, best_col) for player to move: the final connected-four
+        difference under perfect play, and the lowest column that achieves it.
+        check is called every few thousand nodes and may raise to abort.
+        """
+        self.nodes = 0
+        self.cutoffs = 0
+        self._check = check
+        opponent = 3 - player
+        center = (board.cols - 1) / 2
+        moves = sorted(self._unique_moves(board), key=lambda col: (abs(col - center), col))
+
+        best_col = None
+        value = -float('inf')
+        for col in moves:
+            # A lower column is searched with alpha lowered by one so an equal
+            # score comes back exact and wins the tie, as in AIAgent._minimax
+            tie_break = best_col is not None and col < best_col
+            alpha = value - 1 if tie_break else value
+            board.make_move(col, player)
+            try:
+                score = -self._negamax(board, -float('inf'), -alpha, opponent)
+            finally:
+                board.undo_move(col)
+            if score > value or (tie_break and score == value):
+                value = score
+                best_col = col
+        return value, best_col
+
+    @staticmethod
+    def _unique_moves(board):
+        """Valid moves, keeping only the lower column of each mirrored pair in a symmetric position."""
+        moves = board.get_valid_moves()
+        if board.is_symmetric():
+            moves = [col for col in moves if 2 * col <= board.cols - 1]
+        return moves
+
+    def _negamax(self, board, alpha, beta, player):
+        self.nodes += 1
+        if self._check is not None and not self.nodes & self.CHECK_MASK:
+            self._check()
+
+        opponent = 3 - player
+        if board.is_board_full():
+            return board.count_connected_fours(player) - board.count_connected_fours(opponent)
+
+        # Final score bounds: fours can only be made in windows the opponent has not entered
+        upper = board.count_open_windows(player) - board.count_connected_fours(opponent)
+        if upper <= alpha:
+            return upper
+        lower = board.count_connected_fours(player) - board.count_open_windows(opponent)
+        if lower >= beta:
+            return lower
+
+        tt = self.transposition_table
+        key = board.key
+        entry = tt.probe(key)
+        hash_move = None
+        if entry is not None:
+            tt_value, flag, hash_move = entry[2], entry[3], board.canonical_move(entry[4])
+            if flag == EXACT or (flag == LOWER_BOUND and tt_value >= beta) or (flag == UPPER_BOUND and tt_value <= alpha):
+                return tt_value
+        alpha_orig = alpha
+
+        center = (board.cols - 1) / 2
+        moves = sorted(self._unique_moves(board), key=lambda col: (col != hash_move, abs(col - center), col))
+        value = -float('inf')
+        best_col = moves[0]
+        for col in moves:
+            board.make_move(col, player)
+            try:
+                score = -self._negamax(board, -beta, -alpha, opponent)
+            finally:
+                board.undo_move(col)
+            if score > value:
+                value = score
+                best_col = col
+                alpha = max(alpha, value)
+            if alpha >= beta:
+                self.cutoffs += 1
+                break
+
+        if value <= alpha_orig:
+            flag = UPPER_BOUND
+        elif value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        tt.store(key, board.rows * board.cols - board.moves_played, value, flag, board.canonical_move(best_col))
+        return value
@@ -0,0 +1,225 @@
+import fcntl
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+
+from TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND
+
+# File layout: header, then buckets of WAYS fixed-size records.
+# Header: magic, version, rows, cols, connect, ways, bucket count, flush generation
+_HEADER = struct.Struct("<4sHBBBBIQ")
+# Record: Zobrist key, value, depth, flag, best move (-1 for none), generation, CRC32 of the fields before it
+_RECORD = struct.Struct("<QdhBbII")
+_CHECKED = _RECORD.size - 4
+MAGIC = b"C4ES"
+VERSION = 1
+WAYS = 4
+
+# Store shared by the GUI's games, next to the code
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluations.store")
+
+_SWAPPED_FLAG = {EXACT: EXACT, LOWER_BOUND: UPPER_BOUND, UPPER_BOUND: LOWER_BOUND}
+
+
+def _pack_record(key, value, depth, flag, best_move, generation):
+    fields = _RECORD.pack(key, value, depth, flag, -1 if best_move is None else best_move, generation, 0)[:_CHECKED]
+    return fields + struct.pack("<I", zlib.crc32(fields))
+
+
+def _unpack_record(data, offset):
+    """(key, value, depth, flag, best_move, generation), or None for an empty or torn slot."""
+    key, value, depth, flag, best_move, generation, check = _RECORD.unpack_from(data, offset)
+    if check != zlib.crc32(data[offset:offset + _CHECKED]):
+        return None
+    return key, value, depth, flag, None if best_move < 0 else best_move, generation
+
+
+class EvaluationStore:
+    """
+    Persistent position -> (depth, value, flag, best move) table in a
+    memory-mapped file, shared by every game and process that opens it.
+
+    The file is a fixed number of buckets of WAYS records, so it never grows.
+    Every process maps it read-only and probes it without locking; results
+    found during a search are buffered in the process and merged into the
+    file by flush() under an exclusive lock. Within a bucket a result replaces
+    the entry for the same position if it is at least as deep, else the
+    entry from the oldest flush (the shallowest among equals) is evicted.
+    Records carry a checksum, so one being rewritten reads as empty.
+
+    Values are kept from player 1's point of view and converted for the
+    player asking, so games with either side as the computer share entries.
+    Only results at least min_depth plies deep are kept; shallower ones are
+    cheaper to search than to look up.
+    """
+
+    def __init__(self, path=STORE_PATH, max_entries=1 << 20, rows=6, cols=7, connect=4, min_depth=3,
+                 max_pending=1 << 14):
+        self.path = path
+        self.min_depth = min_depth
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock_path = path + ".lock"
+
+        with self._locked():
+            if not os.path.exists(path):
+                buckets = 1
+                while buckets * 2 * WAYS <= max_entries:
+                    buckets *= 2
+                temp_path = path + ".tmp"
+                with open(temp_path, "wb") as file:
+                    file.write(_HEADER.pack(MAGIC, VERSION, rows, cols, connect, WAYS, buckets, 0))
+                    file.truncate(_HEADER.size + buckets * WAYS * _RECORD.size)
+                os.replace(temp_path, path)
+            with open(path, "rb") as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.rows, self.cols, self.connect, ways, buckets, _ = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or ways != WAYS:
+            self.close()
+            raise ValueError(f"Not an evaluation store: {path}")
+        if len(self._mmap) != _HEADER.size + buckets * WAYS * _RECORD.size:
+            self.close()
+            raise ValueError(f"Truncated evaluation store: {path}")
+        self._mask = buckets - 1
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.flushed = 0
+        self.evictions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Flush pending results and unmap the file."""
+        if self._mmap is not None:
+            self.flush()
+            self._mmap.close()
+            self._mmap = None
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock shared with every other process using the store (creating and flushing)."""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @property
+    def capacity(self):
+        return (self._mask + 1) * WAYS
+
+    def matches(self, board):
+        """True if board has this store's size and a Zobrist hash."""
+        return (board.rows, board.cols, getattr(board, 'connect', 4)) == (self.rows, self.cols, self.connect) \
+            and hasattr(board, 'hash')
+
+    def probe(self, key, player):
+        """
+        Returns (key, depth, value, flag, best_move, 0) for player's point of
+        view, laid out like a TranspositionTable entry, or None.
+        """
+        pending = self._pending.get(key)
+        if pending is not None:
+            found = (key,) + pending
+        else:
+            found = None
+            data = self._mmap
+            offset = _HEADER.size + (key & self._mask) * WAYS * _RECORD.size
+            for slot in range(WAYS):
+                record = _unpack_record(data, offset + slot * _RECORD.size)
+                if record is not None and record[0] == key:
+                    found = (key, record[2], record[1], record[3], record[4])
+                    break
+        if found is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        _, depth, value, flag, best_move = found
+        if player == 2:
+            value, flag = -value, _SWAPPED_FLAG[flag]
+        return key, depth, value, flag, best_move, 0
+
+    def record(self, key, depth, value, flag, best_move, player):
+        """Buffer a search result from player's point of view; flushed automatically past max_pending."""
+        if depth < self.min_depth:
+            return
+        if player == 2:
+            value, flag = -value, _SWAPPED_FLAG[flag]
+        current = self._pending.get(key)
+        if current is None or depth >= current[0]:
+            self._pending[key] = (depth, value, flag, best_move)
+        if len(self._pending) >= self.max_pending:
+            self.flush()
+
+    def flush(self):
+        """Merge the buffered results into the file. Returns the number written."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        written = 0
+        with self._locked(), open(self.path, "r+b") as file:
+            data = mmap.mmap(file.fileno(), 0)
+            try:
+                generation = _HEADER.unpack_from(data)[7] + 1
+                for key, (depth, value, flag, best_move) in pending.items():
+                    bucket = _HEADER.size + (key & self._mask) * WAYS * _RECORD.size
+                    target = victim = None
+                    for slot in range(WAYS):
+                        offset = bucket + slot * _RECORD.size
+                        record = _unpack_record(data, offset)
+                        if record is None:
+                            target = target or (offset, None)
+                            continue
+                        if record[0] == key:
+                            target = (offset, record)
+                            break
+                        # Oldest flush first, then the shallowest entry
+                        if victim is None or (record[5], record[2]) < (victim[1][5], victim[1][2]):
+                            victim = (offset, record)
+                    if target is not None and target[1] is not None and target[1][0] == key:
+                        if depth < target[1][2]:
+                            continue  # Keep the deeper result already stored
+                    elif target is None:
+                        target = victim
+                        self.evictions += 1
+                    data[target[0]:target[0] + _RECORD.size] = _pack_record(key, value, depth, flag, best_move,
+                                                                             generation)
+                    written += 1
+                data[_HEADER.size - 8:_HEADER.size] = struct.pack("<Q", generation)
+                data.flush()
+            finally:
+                data.close()
+        self.flushed += written
+        return written
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def get_stats(self):
+        """Counters for monitoring: hits, misses, entries flushed and evicted, and fill."""
+        data = self._mmap
+        filled = sum(1 for offset in range(_HEADER.size, len(data), _RECORD.size)
+                     if _unpack_record(data, offset) is not None)
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'pending': len(self._pending),
+            'flushed': self.flushed,
+            'evictions': self.evictions,
+            'filled': filled,
+            'capacity': self.capacity,
+        }
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+from TranspositionTable import EXACT
+
+
+class ExpectimaxCache:
+    """
+    Size-bounded LRU cache of expectiminimax node values.
+
+    Entries are keyed by (Zobrist hash, remaining depth, maximizing) and hold
+    (value, flag, best_move). Expectiminimax values depend on the exact depth
+    left, so unlike the transposition table an entry is only reused at the same
+    depth. Neighbouring chance nodes share landing positions, so each shared
+    outcome subtree is searched once per search. Values are from the searching
+    agent's point of view, so each agent needs its own cache.
+
+    With scope 'search' the cache is emptied by new_search() before every
+    get_best_move call; with 'game' entries are kept across moves until the
+    least recently used ones are evicted.
+    """
+
+    SCOPES = ('search', 'game')
+
+    def __init__(self, max_entries=1 << 18, scope='game'):
+        if scope not in self.SCOPES:
+            raise ValueError(f"Unknown cache scope: {scope}")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.scope = scope
+        self._entries = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def new_search(self):
+        """Called before every get_best_move; drops all entries with scope 'search'."""
+        if self.scope == 'search':
+            self._entries.clear()
+
+    def clear(self):
+        self._entries.clear()
+        self.reset_stats()
+
+    def probe(self, key):
+        """Returns the (value, flag, best_move) stored for key, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(self, key, value, flag=EXACT, best_move=None):
+        entries = self._entries
+        entries[key] = (value, flag, best_move)
+        entries.move_to_end(key)
+        self.stores += 1
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def get_stats(self):
+        """Counters for monitoring: hits, misses, stores, evictions and fill."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate(),
+            'filled': len(self._entries),
+            'capacity': self.max_entries,
+        }
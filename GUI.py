@@ -3,13 +3,27 @@ from tkinter import messagebox, ttk
 import time
 import random
 import io 
-from GameBoard import ConnectFourBoard
+from BitBoard import BitBoard
 from AIAgent import AIAgent 
+from SearchTracer import RecordingTracer
+from TranspositionTable import TranspositionTable
+from ExpectimaxCache import ExpectimaxCache
+from MoveOrdering import MoveOrderer
+from OpeningBook import OpeningBook
+from EndgameSolver import EndgameSolver
+from EvaluationStore import EvaluationStore
+from SearchWorker import SearchWorker, Ponderer
+from TreeViewer import TreeRenderer
 # Dependencies for Graphic Visualization
-from graphviz import Source 
 from PIL import Image, ImageTk 
 
 class ConnectFourGUI:
+    POLL_INTERVAL_MS = 100  # How often the background search is checked for progress
+    # Cells are at most CELL_SIZE pixels and shrink so larger boards fit in MAX_BOARD_WIDTH x MAX_BOARD_HEIGHT
+    CELL_SIZE = 100
+    MAX_BOARD_WIDTH = 900
+    MAX_BOARD_HEIGHT = 700
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Connect Four - Human vs Computer")
@@ -20,15 +34,33 @@ class ConnectFourGUI:
         self.computer_color = None
         self.algorithm = None
         self.difficulty = None
+        self.time_limit = None
         self.game_board = None
         self.computer_player = None
         self.human_player = None
         self.agent = None
         
         self.computer_response_time = 0
+        self.last_stats = None  # SearchStats of the computer's last move
+        self.evaluation_store = None  # Opened on the first game, shared by all later ones
+        
+        # Background search state: the running SearchWorker and pending root.after callbacks
+        self.search_worker = None
+        self.ponderer = None
+        self._ponder_move = None  # Computer reply found while the human was thinking
+        self._ponder_stats = None
+        self._human_col = None  # Human's last column, taken back if the computer's search fails
+        self._search_start_time = 0
+        self._poll_id = None
+        self._move_after_id = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Variable to store the Graphviz DOT source string for rendering
         self.last_graph_source = "" 
+        # Recorded tree of the last traced search and the move it was searched for
+        self.last_tree = None
+        self.last_tree_move = 0
+        self.tree_renderer = TreeRenderer()
         
         self.setup_welcome_screen()
     
@@ -84,7 +116,9 @@ class ConnectFourGUI:
         algorithms = [
             ("Minimax with Alpha-Beta Pruning", "minimax_ab"),
             ("Minimax without Alpha-Beta", "minimax"),
-            ("Expected Minimax", "expected_minimax")
+            ("Expected Minimax", "expected_minimax"),
+            ("Expected Minimax with Star1/Star2 Pruning", "expected_minimax_star"),
+            ("Principal Variation Search (Negamax)", "pvs")
         ]
         
         for text, value in algorithms:
@@ -102,6 +136,40 @@ class ConnectFourGUI:
                                    font=("Arial", 10), length=300)
         difficulty_scale.pack(pady=10)
         
+        board_frame = tk.LabelFrame(self.root, text="Board (rows x columns, pieces in a row to score)", 
+                                   font=("Arial", 12, "bold"), padx=10, pady=10)
+        board_frame.pack(pady=10, padx=20, fill="x")
+        
+        self.rows_var = tk.IntVar(value=6)
+        self.cols_var = tk.IntVar(value=7)
+        self.connect_var = tk.IntVar(value=4)
+        for text, variable, low, high in (("Rows", self.rows_var, 4, 12), ("Columns", self.cols_var, 4, 14),
+                                          ("Connect", self.connect_var, 3, 6)):
+            tk.Label(board_frame, text=text, font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+            tk.Spinbox(board_frame, from_=low, to=high, width=3, textvariable=variable,
+                       font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+        
+        time_frame = tk.LabelFrame(self.root, text="Time Limit per Move (seconds, 0 = fixed depth K)", 
+                                  font=("Arial", 12, "bold"), padx=10, pady=10)
+        time_frame.pack(pady=10, padx=20, fill="x")
+        
+        self.time_limit_var = tk.IntVar(value=0)
+        
+        time_scale = tk.Scale(time_frame, from_=0, to=30, 
+                             orient=tk.HORIZONTAL, variable=self.time_limit_var,
+                             font=("Arial", 10), length=300)
+        time_scale.pack(pady=10)
+        
+        # Tracing the search tree is only needed for the "Show Search Tree" pop-up and slows the search down
+        self.trace_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.root, text="Record search tree for visualization (slower)",
+                       variable=self.trace_var, font=("Arial", 10)).pack(pady=5)
+        
+        # Pondering searches the computer's replies during the human's turn (not while tracing)
+        self.ponder_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.root, text="Think on the human's time (pondering)",
+                       variable=self.ponder_var, font=("Arial", 10)).pack(pady=5)
+        
         start_btn = tk.Button(self.root, text="Start Game", 
                              font=("Arial", 14, "bold"), bg="green", fg="white",
                              command=self.start_game, width=15, height=2)
@@ -111,9 +179,22 @@ class ConnectFourGUI:
         """Initialize the game with selected settings"""
         self.algorithm = self.algorithm_var.get()
         self.difficulty = self.difficulty_var.get()
-        self.game_board = ConnectFourBoard()
-        
-        self.agent = AIAgent(self.computer_player, self.human_player, self.difficulty)
+        self.time_limit = self.time_limit_var.get() or None
+        self.pondering = self.ponder_var.get() and not self.trace_var.get()
+        self.game_board = BitBoard(self.rows_var.get(), self.cols_var.get(), self.connect_var.get())
+        self.last_stats = None
+        self._human_col = None
+        if self.evaluation_store is None:
+            self.evaluation_store = EvaluationStore()
+        
+        tracer = RecordingTracer() if self.trace_var.get() else None
+        self.agent = AIAgent(self.computer_player, self.human_player, self.difficulty, tracer=tracer,
+                             transposition_table=TranspositionTable(),
+                             move_orderer=MoveOrderer(self.game_board.cols),
+                             expectimax_cache=ExpectimaxCache(),
+                             opening_book=OpeningBook.load(self.algorithm),
+                             endgame_solver=EndgameSolver(),
+                             evaluation_store=self.evaluation_store)
 
         self.setup_game_screen()
     
@@ -152,7 +233,10 @@ class ConnectFourGUI:
         self.time_label.pack(side=tk.LEFT, padx=20)
         
         # Game board canvas
-        self.canvas = tk.Canvas(self.root, width=700, height=600, bg="blue")
+        self.cell_size = min(self.CELL_SIZE, self.MAX_BOARD_WIDTH // self.game_board.cols,
+                             self.MAX_BOARD_HEIGHT // self.game_board.rows)
+        self.canvas = tk.Canvas(self.root, width=self.game_board.cols * self.cell_size,
+                                height=self.game_board.rows * self.cell_size, bg="blue")
         self.canvas.pack(pady=10)
 
         # Control buttons frame
@@ -177,82 +261,116 @@ class ConnectFourGUI:
         
         # If computer goes first, make its move
         if self.game_board.current_player == self.computer_player:
-            self.root.after(500, self.computer_move)
+            self._move_after_id = self.root.after(500, self.computer_move)
             
     def show_search_tree_popup(self):
-        """Renders the Graphviz source and displays it as an image in a pop-up window."""
-        if not self.last_graph_source:
+        """Shows the last recorded search tree in a pop-up, a few levels at a time.
+
+        Only the top levels (or the principal variation and its siblings) are
+        drawn; hidden subtrees appear as "+N nodes" boxes that expand on click.
+        Graphviz runs on the TreeRenderer thread, so large trees never freeze the game.
+        """
+        if self.last_tree is None:
             messagebox.showinfo("Search Tree", "The computer has not made a move yet.")
             return
 
-        try:
-            # 1. Render DOT source to PNG data in memory
-            # Graphviz is used to render the graph definition created in AIAgent.py
-            dot = Source(self.last_graph_source)
-            png_bytes = dot.pipe(format='png')
-            
-            # 2. Load PNG data into PIL Image object
-            image_data = io.BytesIO(png_bytes)
-            pil_image = Image.open(image_data)
-            
-            # 3. Create Tkinter Toplevel window
-            popup = tk.Toplevel(self.root)
-            popup.title("AI Minimax Tree (Depth K={})".format(self.difficulty))
-            popup.grab_set() 
+        tree, move_number = self.last_tree, self.last_tree_move
+        expanded = set()
+        
+        popup = tk.Toplevel(self.root)
+        popup.title("AI Search Tree (Depth K={}, {:,} nodes)".format(self.difficulty, len(tree)))
+        popup.geometry("{}x{}".format(int(self.root.winfo_screenwidth() * 0.6), int(self.root.winfo_screenheight() * 0.6)))
 
-            # 4. Create scrollable canvas for the potentially large image
-            canvas_frame = tk.Frame(popup)
-            canvas_frame.pack(expand=True, fill=tk.BOTH)
+        # View controls
+        controls = tk.Frame(popup)
+        controls.pack(fill=tk.X, pady=5)
+        pv_var = tk.BooleanVar(value=False)
+        levels_var = tk.IntVar(value=3)
+        tk.Radiobutton(controls, text="Top levels", variable=pv_var, value=False,
+                       command=lambda: refresh()).pack(side=tk.LEFT, padx=5)
+        tk.Spinbox(controls, from_=1, to=max(1, tree.search_depth), width=3, textvariable=levels_var,
+                   command=lambda: refresh()).pack(side=tk.LEFT)
+        tk.Radiobutton(controls, text="Principal variation", variable=pv_var, value=True,
+                       command=lambda: refresh()).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Collapse all", command=lambda: (expanded.clear(), refresh())).pack(side=tk.LEFT, padx=5)
+        status_label = tk.Label(controls, text="", font=("Arial", 10))
+        status_label.pack(side=tk.LEFT, padx=10)
 
-            tree_canvas = tk.Canvas(canvas_frame, bg='white')
-            
-            # Scrollbars
-            v_scrollbar = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=tree_canvas.yview)
-            h_scrollbar = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=tree_canvas.xview)
-            tree_canvas.config(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        # Scrollable canvas for the potentially large image
+        canvas_frame = tk.Frame(popup)
+        canvas_frame.pack(expand=True, fill=tk.BOTH)
+        tree_canvas = tk.Canvas(canvas_frame, bg='white')
+        v_scrollbar = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=tree_canvas.yview)
+        h_scrollbar = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=tree_canvas.xview)
+        tree_canvas.config(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        tree_canvas.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        tree_canvas.targets = {}
 
-            v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-            tree_canvas.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        def refresh():
+            try:
+                levels = levels_var.get()
+            except tk.TclError:
+                return
+            future = self.tree_renderer.request(move_number, tree, levels, pv_var.get(), expanded)
+            status_label.config(text="Rendering...")
+            poll(future)
 
-            # 5. Convert PIL image to Tkinter PhotoImage and display
+        def poll(future):
+            if not popup.winfo_exists():
+                return
+            if not future.done():
+                popup.after(self.POLL_INTERVAL_MS, poll, future)
+                return
+            try:
+                png_bytes, targets = future.result()
+            except Exception as e:
+                # This robust error handling guides the user to fix the required installations.
+                status_label.config(text="Rendering failed")
+                messagebox.showerror("Visualization Error", 
+                                     f"Failed to render graphic tree. Check required installations:\n1. Graphviz system tool\n2. Python packages (pip install graphviz pillow)\n\nDetailed Error: {e}", parent=popup)
+                print(f"Graphviz rendering error: {e}")
+                return
+            pil_image = Image.open(io.BytesIO(png_bytes))
             tk_image = ImageTk.PhotoImage(pil_image)
+            tree_canvas.delete("all")
             tree_canvas.create_image(0, 0, anchor=tk.NW, image=tk_image)
-            
             # CRITICAL: Configure scroll region and keep a reference
             tree_canvas.config(scrollregion=(0, 0, pil_image.width, pil_image.height))
-            tree_canvas.image = tk_image 
+            tree_canvas.image = tk_image
+            tree_canvas.targets = targets
+            status_label.config(text=f"{len(targets)} collapsed subtree(s)")
 
-            # Set popup size (maximized to screen size if necessary)
-            max_width = self.root.winfo_screenwidth() * 0.9
-            max_height = self.root.winfo_screenheight() * 0.9
-            w = min(pil_image.width, int(max_width))
-            h = min(pil_image.height, int(max_height))
-            
-            popup.geometry(f"{w}x{h}")
-            
-        except Exception as e:
-            # This robust error handling guides the user to fix the required installations.
-            messagebox.showerror("Visualization Error", 
-                                 f"Failed to render graphic tree. Check required installations:\n1. Graphviz system tool\n2. Python packages (pip install graphviz pillow)\n\nDetailed Error: {e}")
-            print(f"Graphviz rendering error: {e}")
+        def on_click(event):
+            x, y = tree_canvas.canvasx(event.x), tree_canvas.canvasy(event.y)
+            for node, (x0, y0, x1, y1) in tree_canvas.targets.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    expanded.add(node)
+                    refresh()
+                    return
+
+        tree_canvas.bind("<Button-1>", on_click)
+        refresh()
     
     def draw_board(self):
         """Draw the Connect Four board with round cells"""
         self.canvas.delete("all")
         
-        cell_width = 100
-        cell_height = 100
-        padding = 10
+        rows, cols = self.game_board.rows, self.game_board.cols
+        cell_width = self.cell_size
+        cell_height = self.cell_size
+        padding = self.cell_size // 10
+        inset = self.cell_size // 20
         
         # Draw board background
-        self.canvas.create_rectangle(0, 0, 700, 600, fill="blue", outline="blue")
+        self.canvas.create_rectangle(0, 0, cols * cell_width, rows * cell_height, fill="blue", outline="blue")
         
         # Draw cells and pieces
-        for col in range(7):
-            for row in range(6):
+        for col in range(cols):
+            for row in range(rows):
                 x1 = col * cell_width + padding
-                y1 = (5 - row) * cell_height + padding  # Invert y-axis
+                y1 = (rows - 1 - row) * cell_height + padding  # Invert y-axis
                 x2 = x1 + cell_width - 2 * padding
                 y2 = y1 + cell_height - 2 * padding
                 
@@ -260,9 +378,10 @@ class ConnectFourGUI:
                 self.canvas.create_oval(x1, y1, x2, y2, fill="white", outline="blue")
                 
                 # Draw piece if present
-                if self.game_board.board[col][row] != 0:
-                    color = "yellow" if self.game_board.board[col][row] == 1 else "red"
-                    self.canvas.create_oval(x1 + 5, y1 + 5, x2 - 5, y2 - 5, 
+                cell = self.game_board.get_cell(col, row)
+                if cell != 0:
+                    color = "yellow" if cell == 1 else "red"
+                    self.canvas.create_oval(x1 + inset, y1 + inset, x2 - inset, y2 - inset, 
                                           fill=color, outline=color)
     
     def human_move(self, event):
@@ -270,40 +389,96 @@ class ConnectFourGUI:
         if self.game_board.game_over or self.game_board.current_player == self.computer_player:
             return
             
-        col = event.x // 100
+        col = event.x // self.cell_size
         
-        if 0 <= col < 7 and self.game_board.is_valid_move(col):
+        if self.game_board.is_valid_move(col):
+            if self.ponderer is not None:
+                self._ponder_move = self.ponderer.take(col)
+                self._ponder_stats = self.ponderer.stats.get(col)
+                self.ponderer = None
             result = self.game_board.play_at_column(col)
             if result:
+                self._human_col = col
                 self.draw_board()
                 self.update_display()
                 
                 if not self.game_board.game_over:
-                    self.root.after(500, self.computer_move) 
+                    self._move_after_id = self.root.after(500, self.computer_move)
                 else:
                     self.game_finished()
     
     def computer_move(self):
-        """Handle computer player's move using the selected AI algorithm"""
+        """Start the computer's search in the background; _poll_search applies the move when it is done"""
+        self._move_after_id = None
         if self.game_board.game_over or self.game_board.current_player == self.human_player:
             return
+        if self.search_worker is not None:
+            return
             
-        start_time = time.time()
+        self._search_start_time = time.time()
+        if self._ponder_move is not None:
+            # Pondering already searched this position
+            col, self._ponder_move = self._ponder_move, None
+            self._play_computer_move(col, self._ponder_stats)
+            return
         
-        col = self.agent.get_best_move(self.game_board, self.algorithm)
-
+        self.search_worker = SearchWorker(self.agent, self.game_board, self.algorithm, self.time_limit).start()
+        self._poll_id = self.root.after(self.POLL_INTERVAL_MS, self._poll_search)
+    
+    def _poll_search(self):
+        """Show live search progress, or play the computer's move once the search has finished"""
+        self._poll_id = None
+        worker = self.search_worker
+        if worker is None:
+            return
+        
+        if not worker.done():
+            progress = worker.progress()
+            self.time_label.config(text=f"Thinking... depth {progress['depth']} | {progress['nodes']:,} nodes | "
+                                        f"{progress['nodes_per_second']:,.0f} nodes/s")
+            self._poll_id = self.root.after(self.POLL_INTERVAL_MS, self._poll_search)
+            return
+        
+        self.search_worker = None
+        if worker.cancelled:
+            return
+        if worker.error is not None:
+            self._search_failed(worker.error)
+            return
+        self._play_computer_move(worker.result, self.agent.get_search_stats())
+    
+    def _search_failed(self, error):
+        """Report a failed search and take back the human's move so they can play again"""
+        message = f"Computer search failed: {str(error) or type(error).__name__}"
+        if self._human_col is not None:
+            self.game_board.undo_move(self._human_col)
+            self.game_board.switch_turns()
+            self._human_col = None
+            self.draw_board()
+            self.update_display()
+            message += " | your move was taken back"
+        else:
+            message += " | start a new game"
+        self.time_label.config(text=message)
+    
+    def _play_computer_move(self, col, stats=None):
+        """Play the computer's chosen column and start pondering on the human's reply"""
+        self.last_stats = stats
         # 1. Store the Graphviz DOT source string
         self.last_graph_source = self.agent.get_graphviz_source()
+        if self.last_graph_source:
+            self.last_tree = self.agent.tracer.tree
+            self.last_tree_move = self.game_board.moves_played
         
-        # 2. Enable the Show Search Tree button
-        if hasattr(self, 'tree_btn'):
+        # 2. Enable the Show Search Tree button (only when the search was traced)
+        if hasattr(self, 'tree_btn') and self.last_graph_source:
             self.tree_btn.config(state="normal")
         
         # Proceed with the move
         if col != -1 and self.game_board.is_valid_move(col):
             result = self.game_board.play_at_column(col)
             
-            self.computer_response_time = time.time() - start_time
+            self.computer_response_time = time.time() - self._search_start_time
             
             if result:
                 self.draw_board()
@@ -311,9 +486,27 @@ class ConnectFourGUI:
                 
                 if self.game_board.game_over:
                     self.game_finished()
+                elif self.pondering:
+                    self.ponderer = Ponderer(self.agent, self.game_board, self.algorithm, self.time_limit).start()
         else:
             self.game_finished()
     
+    def cancel_search(self):
+        """Stop the background search and pondering (if any) and drop pending callbacks"""
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.search_worker = None
+        if self.ponderer is not None:
+            self.ponderer.stop()
+            self.ponderer = None
+        self._ponder_move = None
+        self._ponder_stats = None
+        for after_id in (self._poll_id, self._move_after_id):
+            if after_id is not None:
+                self.root.after_cancel(after_id)
+        self._poll_id = None
+        self._move_after_id = None
+    
     def update_display(self):
         """Update the game information display"""
         # Update current player
@@ -327,10 +520,14 @@ class ConnectFourGUI:
         self.score_label.config(text=f"Human: {human_score} | Computer: {computer_score}")
         
         # Update response time
-        self.time_label.config(text=f"Computer time: {self.computer_response_time:.2f}s")
+        time_text = f"Computer time: {self.computer_response_time:.2f}s"
+        if self.last_stats is not None:
+            time_text += f" | {self.last_stats.summary()}"
+        self.time_label.config(text=time_text)
     
     def game_finished(self):
         """Handle game completion"""
+        self.evaluation_store.flush()
         human_score = self.game_board.count_connected_fours(self.human_player)
         computer_score = self.game_board.count_connected_fours(self.computer_player)
         
@@ -351,7 +548,10 @@ class ConnectFourGUI:
             self.root.quit()
     
     def restart_game(self):
+        self.cancel_search()
         self.last_graph_source = "" 
+        self.last_tree = None
+        self.tree_renderer.clear()
         self.setup_welcome_screen()
     
     def clear_screen(self):
@@ -359,6 +559,14 @@ class ConnectFourGUI:
         for widget in self.root.winfo_children():
             widget.destroy()
     
+    def on_close(self):
+        """Window close: cancel any running search and exit"""
+        self.cancel_search()
+        self.tree_renderer.close()
+        if self.evaluation_store is not None:
+            self.evaluation_store.close()
+        self.root.destroy()
+    
     def run(self):
         """Start the application"""
         self.root.mainloop()
@@ -1,7 +1,21 @@
+from functools import lru_cache
+
+from BitBoard import window_tables, window_weights
+
+
+@lru_cache(maxsize=None)
+def window_cells(rows, cols, connect=4):
+    """Every window of connect cells as (col, row) pairs, for indexing ConnectFourBoard.board."""
+    windows, _ = window_tables(rows, cols, connect)
+    return tuple(tuple(divmod(cell, rows + 1) for cell in window) for window in windows)
+
+
 class ConnectFourBoard:
-    def __init__(self, rows=6, cols=7):
+    def __init__(self, rows=6, cols=7, connect=4):
         self.rows = rows
         self.cols = cols
+        self.connect = connect
+        self._windows = window_cells(rows, cols, connect)
         self.board = [[0 for _ in range(rows)] for _ in range(cols)]
         self.current_player = 1 
         self.game_over = False
@@ -31,6 +45,21 @@ class ConnectFourBoard:
         
         return None  # Column is full
     
+    def make_move(self, col, player):
+        """Drop a piece for player into col without switching turns. Returns the row."""
+        for row in range(self.rows):
+            if self.board[col][row] == 0:
+                self.board[col][row] = player
+                return row
+        return -1
+    
+    def undo_move(self, col):
+        """Remove the top piece of col (the inverse of make_move)."""
+        for row in range(self.rows - 1, -1, -1):
+            if self.board[col][row] != 0:
+                self.board[col][row] = 0
+                return
+    
     def is_valid_move(self, col):
         if col < 0 or col >= self.cols:
             return False
@@ -45,33 +74,15 @@ class ConnectFourBoard:
                 return False
         return True
     
+    def is_symmetric(self):
+        """True when the position is its own mirror image, so mirrored moves are equivalent."""
+        return all(self.board[col] == self.board[self.cols - 1 - col] for col in range(self.cols // 2))
+    
     def count_connected_fours(self, player):
         count = 0
-        
-        # Check horizontal
-        for row in range(self.rows):
-            for col in range(self.cols - 3):
-                if all(self.board[col + i][row] == player for i in range(4)):
-                    count += 1
-        
-        # Check vertical
-        for col in range(self.cols):
-            for row in range(self.rows - 3):
-                if all(self.board[col][row + i] == player for i in range(4)):
-                    count += 1
-        
-        # Check diagonal (top-left to bottom-right)
-        for col in range(self.cols - 3):
-            for row in range(self.rows - 3):
-                if all(self.board[col + i][row + i] == player for i in range(4)):
-                    count += 1
-        
-        # Check diagonal (top-right to bottom-left)
-        for col in range(3, self.cols):
-            for row in range(self.rows - 3):
-                if all(self.board[col - i][row + i] == player for i in range(4)):
-                    count += 1
-        
+        for window in self._windows:
+            if all(self.board[col][row] == player for col, row in window):
+                count += 1
         return count
     
     def evaluate_heuristic(self, player):
@@ -79,10 +90,10 @@ class ConnectFourBoard:
         Evaluate board heuristic for the given player
         Returns: score where positive favors the player, negative favors opponent
         """
-        weights = {4: 1000, 3: 100, 2: 10, 1: 1} 
+        weights = window_weights(self.connect)
 
         def evaluate_window(window, player):
-            """Evaluate a 4-cell window"""
+            """Evaluate a connect-cell window"""
             opponent = 3 - player
             player_count = 0
             opponent_count = 0
@@ -106,33 +117,14 @@ class ConnectFourBoard:
                 return 0  # Empty window
         
         total_score = 0
-        
-        # Check all horizontal windows
-        for row in range(self.rows):
-            for col in range(self.cols - 3):
-                window = [self.board[col + i][row] for i in range(4)]
-                total_score += evaluate_window(window, player)
-        
-        # Check all vertical windows  
-        for col in range(self.cols):
-            for row in range(self.rows - 3):
-                window = [self.board[col][row + i] for i in range(4)]
-                total_score += evaluate_window(window, player)
-        
-        # Check diagonal (top-left to bottom-right)
-        for col in range(self.cols - 3):
-            for row in range(self.rows - 3):
-                window = [self.board[col + i][row + i] for i in range(4)]
-                total_score += evaluate_window(window, player)
-        
-        # Check diagonal (top-right to bottom-left)
-        for col in range(3, self.cols):
-            for row in range(self.rows - 3):
-                window = [self.board[col - i][row + i] for i in range(4)]
-                total_score += evaluate_window(window, player)
+        for window in self._windows:
+            total_score += evaluate_window([self.board[col][row] for col, row in window], player)
         
         return total_score
     
+    def get_cell(self, col, row):
+        return self.board[col][row]
+    
     def get_board_state(self):
         return [col[:] for col in self.board]  # Return a copy
     
@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from ExpectimaxCache import ExpectimaxCache
+from MoveOrdering import MoveOrderer
+from TranspositionTable import TranspositionTable
+
+# Searches are never given less than this, so a request that waited out its budget still gets a move
+MIN_SEARCH_SECONDS = 0.01
+# Board settings a new game may ask for, as offered in the GUI: (lowest, highest)
+BOARD_LIMITS = {'rows': (4, 12), 'cols': (4, 14), 'connect': (3, 6)}
+
+
+def search_move(task):
+    """
+    Worker entry point: the computer's move for a position given as the
+    columns played so far. Returns (col, value, completed_depth, nodes).
+    """
+    moves, rows, cols, connect, algorithm, depth, time_limit = task
+    board = BitBoard(rows, cols, connect)
+    for col in moves:
+        board.play_at_column(col)
+    player = board.current_player
+    agent = AIAgent(player, 3 - player, depth, transposition_table=TranspositionTable(1 << 16),
+                    move_orderer=MoveOrderer(cols), expectimax_cache=ExpectimaxCache(1 << 16))
+    col = agent.get_best_move(board, algorithm, time_limit, max_depth=depth)
+    return col, agent.last_value, agent.completed_depth, agent.nodes
+
+
+class LatencyTracker:
+    """Latency samples of the most recent window requests, for percentiles."""
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """p50 / p99 / max in milliseconds."""
+        return {'p50_ms': round(self.percentile(0.50) * 1000, 2), 'p99_ms': round(self.percentile(0.99) * 1000, 2),
+                'max_ms': round(max(self.samples, default=0.0) * 1000, 2)}
+
+
+class FairQueue:
+    """
+    Queue that serves clients in turn: get() takes the oldest item of the next
+    client with work, so one client with many games cannot starve the others.
+    """
+
+    def __init__(self):
+        self._queues = OrderedDict()  # client -> deque of items, in round-robin order
+        self._size = 0
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return self._size
+
+    def put(self, client, item):
+        self._queues.setdefault(client, deque()).append(item)
+        self._size += 1
+        self._ready.set()
+
+    async def get(self):
+        while not self._size:
+            self._ready.clear()
+            await self._ready.wait()
+        client, queue = next(iter(self._queues.items()))
+        item = queue.popleft()
+        if queue:
+            self._queues.move_to_end(client)
+        else:
+            del self._queues[client]
+        self._size -= 1
+        return item
+
+
+class GameSession:
+    """One game between a remote human and the computer."""
+
+    def __init__(self, game_id, client, algorithm, depth, time_budget, rows, cols, connect, human_player):
+        self.game_id = game_id
+        self.client = client
+        self.algorithm = algorithm
+        self.depth = depth
+        self.time_budget = time_budget
+        self.board = BitBoard(rows, cols, connect)
+        self.moves = []
+        self.human_player = human_player
+        self.computer_player = 3 - human_player
+        self.searching = False
+
+    def play(self, col):
+        self.board.play_at_column(col)
+        self.moves.append(col)
+
+    def undo(self):
+        """Take back the last move, which must not have ended the game."""
+        self.board.undo_move(self.moves.pop())
+        self.board.switch_turns()
+
+    def state(self):
+        board = self.board
+        return {'game': self.game_id, 'moves': self.moves, 'to_move': board.current_player,
+                'human_player': self.human_player, 'over': board.game_over,
+                'score': {'human': board.count_connected_fours(self.human_player),
+                          'computer': board.count_connected_fours(self.computer_player)}}
+
+
+class GameServer:
+    """
+    asyncio server hosting many games over a JSON line protocol.
+
+    Every request is one JSON object on a line and gets one JSON line back:
+
+        {"op": "new", "algorithm": "minimax_ab", "depth": 5, "time_budget": 0.5,
+         "human_first": true, "rows": 6, "cols": 7, "connect": 4}
+        {"op": "move", "game": 1, "col": 3, "time_budget": 0.5}
+        {"op": "state", "game": 1}
+        {"op": "close", "game": 1}
+        {"op": "stats"}
+
+    Computer moves are searched in a process pool shared by all games. A search
+    runs iterative deepening up to the game's depth within its time budget,
+    which starts when the request arrives, so time spent queued is part of it.
+    Admission control turns away new games past max_sessions and moves while
+    max_queue searches are waiting; a rejected move is not played, nor is a
+    move whose search fails. Waiting searches are served round-robin per
+    connection (FairQueue).
+    """
+
+    def __init__(self, workers=None, max_sessions=1000, max_queue=256, default_time_budget=1.0,
+                 max_time_budget=10.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.default_time_budget = default_time_budget
+        self.max_time_budget = max_time_budget
+        self.sessions = {}
+        self._game_ids = itertools.count(1)
+        self._client_ids = itertools.count(1)
+        self._queue = None
+        self._slots = None
+        self._executor = None
+        self._dispatcher = None
+        self._running = 0
+        self.move_latency = LatencyTracker()
+        self.queue_wait = LatencyTracker()
+        self.search_time = LatencyTracker()
+        self.rejected = 0
+        self._start_time = time.perf_counter()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """Run the server until cancelled."""
+        self._queue = FairQueue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        server = await asyncio.start_server(self._handle_client, host, port)
+        print(f"Serving on {', '.join(str(sock.getsockname()) for sock in server.sockets)} "
+              f"with {self.workers} search workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._dispatcher.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Search Scheduling ---
+    async def _dispatch(self):
+        """Start queued searches as pool workers free up, in FairQueue order."""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Pick the next search only once a worker is free, so the choice is as fair as possible
+            await self._slots.acquire()
+            task, future, queued_at, deadline = await self._queue.get()
+            started = time.perf_counter()
+            self.queue_wait.add(started - queued_at)
+            moves, rows, cols, connect, algorithm, depth = task
+            time_limit = max(MIN_SEARCH_SECONDS, deadline - started)
+            try:
+                search = loop.run_in_executor(self._executor, search_move,
+                                              (moves, rows, cols, connect, algorithm, depth, time_limit))
+            except Exception as error:
+                # E.g. BrokenProcessPool after a worker died: fail this search and start a new pool
+                self._slots.release()
+                if not future.cancelled():
+                    future.set_exception(error)
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                continue
+            self._running += 1
+            search.add_done_callback(lambda done, future=future, started=started: self._finish(done, future, started))
+
+    def _finish(self, search, future, started):
+        self._running -= 1
+        self._slots.release()
+        self.search_time.add(time.perf_counter() - started)
+        if future.cancelled():
+            return
+        if search.exception() is not None:
+            future.set_exception(search.exception())
+        else:
+            future.set_result(search.result())
+
+    async def _computer_move(self, session, client, received, time_budget):
+        """Queue a search for session and play its result. Returns (col, value, depth)."""
+        board = session.board
+        task = (list(session.moves), board.rows, board.cols, board.connect, session.algorithm, session.depth)
+        future = asyncio.get_running_loop().create_future()
+        session.searching = True
+        try:
+            self._queue.put(client, (task, future, time.perf_counter(), received + time_budget))
+            col, value, depth, _ = await future
+        finally:
+            session.searching = False
+        session.play(col)
+        return col, value, depth
+
+    # --- Protocol ---
+    async def _handle_client(self, reader, writer):
+        client = next(self._client_ids)
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    response = await self._handle(request, client, owned, received)
+                except Exception as error:
+                    # A bad request gets an error reply; the connection and its games carry on
+                    response = {'ok': False, 'error': str(error) or type(error).__name__}
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Games live as long as the connection that created them
+            for game_id in owned:
+                self.sessions.pop(game_id, None)
+            writer.close()
+
+    @staticmethod
+    def _game_settings(request):
+        """(algorithm, depth, rows, cols, connect) of a new game request; ValueError if out of range."""
+        algorithm = request.get('algorithm', 'minimax_ab')
+        if algorithm not in AIAgent.ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        depth = int(request.get('depth', 5))
+        if depth < 1:
+            raise ValueError(f"depth must be at least 1, not {depth}")
+        sizes = {}
+        for name, default in (('rows', 6), ('cols', 7), ('connect', 4)):
+            low, high = BOARD_LIMITS[name]
+            sizes[name] = int(request.get(name, default))
+            if not low <= sizes[name] <= high:
+                raise ValueError(f"{name} must be between {low} and {high}, not {sizes[name]}")
+        if sizes['connect'] > max(sizes['rows'], sizes['cols']):
+            raise ValueError(f"connect {sizes['connect']} does not fit a {sizes['rows']}x{sizes['cols']} board")
+        return algorithm, depth, sizes['rows'], sizes['cols'], sizes['connect']
+
+    def _time_budget(self, request, session=None):
+        budget = request.get('time_budget', session.time_budget if session else self.default_time_budget)
+        return min(float(budget), self.max_time_budget)
+
+    async def _handle(self, request, client, owned, received):
+        op = request.get('op')
+        if op not in ('new', 'move', 'state', 'close', 'stats'):
+            raise ValueError(f"Unknown op: {op}")
+        if op == 'stats':
+            return {'ok': True, **self.get_stats()}
+
+        if op == 'new':
+            if len(self.sessions) >= self.max_sessions:
+                self.rejected += 1
+                return {'ok': False, 'error': 'server full', 'retry': True}
+            algorithm, depth, rows, cols, connect = self._game_settings(request)
+            human_first = request.get('human_first', True)
+            if not human_first and len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                return {'ok': False, 'error': 'busy', 'retry': True}
+            session = GameSession(next(self._game_ids), client, algorithm, depth, self._time_budget(request), rows,
+                                  cols, connect, 1 if human_first else 2)
+            self.sessions[session.game_id] = session
+            owned.add(session.game_id)
+            response = {'ok': True}
+            if not human_first:
+                try:
+                    col, value, depth = await self._computer_move(session, client, received, session.time_budget)
+                except Exception as error:
+                    self.sessions.pop(session.game_id, None)
+                    owned.discard(session.game_id)
+                    return {'ok': False, 'error': f'search failed: {error!r}'}
+                self.move_latency.add(time.perf_counter() - received)
+                response.update(computer=col, value=value, depth=depth)
+            return {**response, **session.state()}
+
+        session = self.sessions.get(request.get('game'))
+        if session is None or session.client != client:
+            return {'ok': False, 'error': 'unknown game'}
+
+        if op == 'state':
+            return {'ok': True, **session.state()}
+
+        if op == 'close':
+            self.sessions.pop(session.game_id, None)
+            owned.discard(session.game_id)
+            return {'ok': True}
+
+        if op == 'move':
+            board = session.board
+            col = int(request['col'])
+            if session.searching or board.game_over or board.current_player != session.human_player:
+                return {'ok': False, 'error': 'not your turn'}
+            if not board.is_valid_move(col):
+                return {'ok': False, 'error': f'invalid column {col}'}
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                return {'ok': False, 'error': 'busy', 'retry': True}
+
+            session.play(col)
+            response = {'ok': True, 'human': col}
+            if not board.game_over:
+                try:
+                    computer_col, value, depth = await self._computer_move(session, client, received,
+                                                                           self._time_budget(request, session))
+                except Exception as error:
+                    # Take the human move back so the game can go on from where it was
+                    session.undo()
+                    return {'ok': False, 'error': f'search failed: {error!r}'}
+                self.move_latency.add(time.perf_counter() - received)
+                response.update(computer=computer_col, value=value, depth=depth)
+            return {**response, **session.state()}
+
+    def get_stats(self):
+        elapsed = time.perf_counter() - self._start_time
+        return {
+            'sessions': len(self.sessions),
+            'queued': len(self._queue) if self._queue is not None else 0,
+            'running': self._running,
+            'workers': self.workers,
+            'moves': self.move_latency.count,
+            'moves_per_second': round(self.move_latency.count / elapsed, 2) if elapsed > 0 else 0.0,
+            'rejected': self.rejected,
+            'move_latency': self.move_latency.summary(),
+            'queue_wait': self.queue_wait.summary(),
+            'search_time': self.search_time.summary(),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect Four game server (JSON lines over TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--max-queue", type=int, default=256, help="waiting searches before moves are turned away")
+    parser.add_argument("--time-budget", type=float, default=1.0, help="default seconds per computer move")
+    parser.add_argument("--max-time-budget", type=float, default=10.0)
+    args = parser.parse_args()
+
+    game_server = GameServer(args.workers, args.max_sessions, args.max_queue, args.time_budget, args.max_time_budget)
+    try:
+        asyncio.run(game_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
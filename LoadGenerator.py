@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from GameServer import LatencyTracker
+
+# Wait before retrying a move the server turned away as busy
+RETRY_DELAY = 0.05
+
+
+class LoadClient:
+    """One connection to a GameServer that plays games with random legal moves."""
+
+    def __init__(self, reader, writer, rng):
+        self.reader = reader
+        self.writer = writer
+        self.rng = rng
+
+    async def request(self, message):
+        self.writer.write((json.dumps(message) + "\n").encode())
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    async def play_game(self, settings, latency, counters):
+        """Play one game to the end; every computer move's round trip goes into latency."""
+        rows, cols = settings.get('rows', 6), settings.get('cols', 7)
+        while True:
+            start_time = time.perf_counter()
+            state = await self.request({'op': 'new', **settings})
+            if state['ok']:
+                break
+            counters['rejected'] += 1
+            await asyncio.sleep(RETRY_DELAY)
+        if 'computer' in state:
+            latency.add(time.perf_counter() - start_time)
+
+        heights = [0] * cols
+        for col in state['moves']:
+            heights[col] += 1
+        while not state['over']:
+            col = self.rng.choice([col for col in range(cols) if heights[col] < rows])
+            start_time = time.perf_counter()
+            response = await self.request({'op': 'move', 'game': state['game'], 'col': col})
+            if not response['ok']:
+                if not response.get('retry'):
+                    raise RuntimeError(f"server refused move: {response['error']}")
+                counters['rejected'] += 1
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            if 'computer' in response:
+                latency.add(time.perf_counter() - start_time)
+                heights[response['computer']] += 1
+            heights[col] += 1
+            counters['moves'] += 1
+            state = response
+        await self.request({'op': 'close', 'game': state['game']})
+        counters['games'] += 1
+
+
+async def run_client(host, port, games, settings, seed, latency, counters):
+    reader, writer = await asyncio.open_connection(host, port)
+    client = LoadClient(reader, writer, random.Random(seed))
+    try:
+        for _ in range(games):
+            await client.play_game(settings, latency, counters)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, games, settings, seed=0):
+    """
+    Run clients concurrent connections playing games games each. Returns the
+    client-side results and the server's own stats afterwards.
+    """
+    latency = LatencyTracker(window=1_000_000)
+    counters = {'games': 0, 'moves': 0, 'rejected': 0}
+    start_time = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, games, settings, seed + index, latency, counters)
+                           for index in range(clients)))
+    elapsed = time.perf_counter() - start_time
+
+    reader, writer = await asyncio.open_connection(host, port)
+    server_stats = await LoadClient(reader, writer, None).request({'op': 'stats'})
+    writer.close()
+    return {'clients': clients, **counters, 'elapsed': round(elapsed, 3),
+            'moves_per_second': round(latency.count / elapsed, 2) if elapsed > 0 else 0.0,
+            'move_latency': latency.summary(), 'server': server_stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for GameServer: concurrent players making random moves")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections, one game at a time each")
+    parser.add_argument("--games", type=int, default=2, help="games per client")
+    parser.add_argument("--algorithm", default="minimax_ab")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--time-budget", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    game_settings = {'algorithm': args.algorithm, 'depth': args.depth, 'time_budget': args.time_budget}
+    result = asyncio.run(run_load(args.host, args.port, args.clients, args.games, game_settings, args.seed))
+    client_latency, server = result['move_latency'], result['server']
+    print(f"{result['clients']} clients: {result['games']} games, {result['moves']} moves in {result['elapsed']:.1f}s "
+          f"({result['moves_per_second']:.1f} computer moves/s), {result['rejected']} rejected")
+    print(f"  client move latency p50 {client_latency['p50_ms']:.1f} ms, p99 {client_latency['p99_ms']:.1f} ms, "
+          f"max {client_latency['max_ms']:.1f} ms")
+    print(f"  server move latency p50 {server['move_latency']['p50_ms']:.1f} ms, "
+          f"p99 {server['move_latency']['p99_ms']:.1f} ms; queue wait p99 {server['queue_wait']['p99_ms']:.1f} ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
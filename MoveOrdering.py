@@ -0,0 +1,63 @@
+class MoveOrderer:
+    """
+    Orders the children of an alpha-beta node so the likely best move is searched first.
+
+    Moves are ranked by, in order of priority: the hash move from the
+    transposition table, the killer moves of the current ply, the history
+    score of the column, and finally a static center-out order.
+    """
+
+    KILLER_SLOTS = 2
+    HASH_MOVE_SCORE = 1 << 30
+    KILLER_SCORE = 1 << 29
+
+    def __init__(self, cols=7, use_hash_move=True, use_killers=True, use_history=True):
+        self.cols = cols
+        self.use_hash_move = use_hash_move
+        self.use_killers = use_killers
+        self.use_history = use_history
+        # Columns sorted by distance from the center, left before right on ties
+        self.center_order = sorted(range(cols), key=lambda col: (abs(2 * col - (cols - 1)), col))
+        self.killers = []
+        self.history = [None, [0] * cols, [0] * cols]  # Indexed by player
+
+    def new_search(self):
+        """Reset killers and age the history table before a new get_best_move call."""
+        self.killers = []
+        for player in (1, 2):
+            self.history[player] = [score >> 1 for score in self.history[player]]
+
+    def order_moves(self, board, ply, player, hash_move=None):
+        """Returns the valid moves of board, best candidates first."""
+        moves = [col for col in self.center_order if board.is_valid_move(col)]
+
+        killers = self.killers[ply] if self.use_killers and ply < len(self.killers) else ()
+        history = self.history[player] if self.use_history else None
+        if not self.use_hash_move:
+            hash_move = None
+        if hash_move is None and not killers and history is None:
+            return moves
+
+        def score(col):
+            value = history[col] if history is not None else 0
+            if col == hash_move:
+                value += self.HASH_MOVE_SCORE
+            elif col in killers:
+                value += self.KILLER_SCORE
+            return value
+
+        # sort() is stable, so equal scores keep the center-out order
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def record_cutoff(self, col, ply, depth, player):
+        """Credit col for causing a beta cutoff at the given ply and remaining depth."""
+        if self.use_killers:
+            while len(self.killers) <= ply:
+                self.killers.append([])
+            killers = self.killers[ply]
+            if col not in killers:
+                killers.insert(0, col)
+                del killers[self.KILLER_SLOTS:]
+        if self.use_history:
+            self.history[player][col] += depth * depth
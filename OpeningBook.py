@@ -0,0 +1,220 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from ExpectimaxCache import ExpectimaxCache
+from MoveOrdering import MoveOrderer
+from TranspositionTable import TranspositionTable
+
+# File layout: header, then records sorted by key.
+# Header: magic, version, rows, cols, connect, search depth, plies, record count, algorithm name
+_HEADER = struct.Struct("<4sHBBBBBI32s")
+_RECORD = struct.Struct("<QdB")  # Zobrist key, score, best column
+MAGIC = b"C4BK"
+VERSION = 2
+
+# Books shipped next to the code, one file per algorithm
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books")
+
+
+def book_path(algorithm, directory=BOOK_DIR):
+    return os.path.join(directory, f"{algorithm}.book")
+
+
+def _pack_header(algorithm, depth, plies, rows, cols, connect, count):
+    return _HEADER.pack(MAGIC, VERSION, rows, cols, connect, depth, plies, count, algorithm.encode())
+
+
+def _unpack_header(data):
+    magic, version, rows, cols, connect, depth, plies, count, name = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an opening book file")
+    return name.rstrip(b"\0").decode(), depth, plies, rows, cols, connect, count
+
+
+class OpeningBook:
+    """
+    Read-only opening book: best moves and scores of the first plies, stored
+    as fixed-size records sorted by the Zobrist key of the position.
+
+    The file is memory-mapped and lookup() binary-searches it in O(log n)
+    without loading it. Scores are from the point of view of the player to move.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.algorithm, self.depth, self.plies, self.rows, self.cols, self.connect, self.count = _unpack_header(self._mmap)
+        if len(self._mmap) != _HEADER.size + self.count * _RECORD.size:
+            self.close()
+            raise ValueError(f"Truncated opening book: {path}")
+
+    @classmethod
+    def load(cls, algorithm, directory=BOOK_DIR):
+        """The book for algorithm in directory, or None if there is none."""
+        path = book_path(algorithm, directory)
+        return cls(path) if os.path.exists(path) else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def lookup(self, key):
+        """Returns (best_col, score) for the position with Zobrist key, or None."""
+        data = self._mmap
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, score, col = _RECORD.unpack_from(data, _HEADER.size + middle * _RECORD.size)
+            if record_key == key:
+                return col, score
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def probe(self, board):
+        """lookup() for board if it matches the book's size; None otherwise."""
+        if (board.rows, board.cols, board.connect) != (self.rows, self.cols, self.connect) or not hasattr(board, 'hash'):
+            return None
+        entry = self.lookup(board.key)
+        if entry is None:
+            return None
+        # Positions are stored once per mirror pair, moves in the orientation of the key
+        # (so between equally good moves the mirrored position gets the mirrored choice)
+        return board.canonical_move(entry[0]), entry[1]
+
+
+# --- Book Generation ---
+def book_positions(plies, rows=6, cols=7, connect=4):
+    """
+    Move sequences reaching every distinct position with fewer than plies
+    pieces, shortest first. Of a position and its mirror image only one is kept.
+    """
+    board = BitBoard(rows, cols, connect)
+    level = {board.key: ((), board)}
+    sequences = []
+    for ply in range(plies):
+        sequences.extend(sequence for sequence, _ in level.values())
+        next_level = {}
+        if ply + 1 < plies:
+            for sequence, board in level.values():
+                for col in board.get_valid_moves():
+                    child = board.copy()
+                    child.play_at_column(col)
+                    next_level.setdefault(child.key, (sequence + (col,), child))
+        level = next_level
+    return sequences
+
+
+def _play(sequence, rows, cols, connect):
+    board = BitBoard(rows, cols, connect)
+    for col in sequence:
+        board.play_at_column(col)
+    return board
+
+
+def _solve(task):
+    """Search one book position. Returns (key, score, best_col), best_col in the orientation of key."""
+    algorithm, depth, rows, cols, connect, sequence = task
+    board = _play(sequence, rows, cols, connect)
+    player = board.current_player
+    agent = AIAgent(player, 3 - player, depth, transposition_table=TranspositionTable(1 << 18),
+                    move_orderer=MoveOrderer(cols), expectimax_cache=ExpectimaxCache())
+    best_col = agent.get_best_move(board, algorithm)
+    return board.key, agent.last_value, board.canonical_move(best_col)
+
+
+def _read_partial(path, header):
+    """Records of an interrupted build; a torn last record is dropped."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:_HEADER.size] != header:
+        raise ValueError(f"{path} was started with different settings; delete it to rebuild")
+    records = {}
+    end = len(data) - (len(data) - _HEADER.size) % _RECORD.size
+    for offset in range(_HEADER.size, end, _RECORD.size):
+        key, score, col = _RECORD.unpack_from(data, offset)
+        records[key] = (score, col)
+    return records
+
+
+def build_book(algorithm, depth, plies, path, workers=None, rows=6, cols=7, connect=4):
+    """
+    Search every position of the first plies plies at depth and write the book
+    to path. Finished positions are appended to path + '.partial' as they come
+    in, so an interrupted build resumes where it stopped.
+    """
+    if algorithm not in AIAgent.ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    header = _pack_header(algorithm, depth, plies, rows, cols, connect, 0)
+    partial_path = path + ".partial"
+    records = _read_partial(partial_path, header)
+
+    sequences = book_positions(plies, rows, cols, connect)
+    tasks = []
+    for sequence in sequences:
+        if _play(sequence, rows, cols, connect).key not in records:
+            tasks.append((algorithm, depth, rows, cols, connect, sequence))
+    print(f"{algorithm}: {len(sequences)} positions, {len(sequences) - len(tasks)} already done")
+
+    start_time = time.perf_counter()
+    with open(partial_path, "ab") as partial:
+        if partial.tell() == 0:
+            partial.write(header)
+        else:
+            # Cut a record torn by the interruption so new ones stay aligned
+            partial.truncate(partial.tell() - (partial.tell() - _HEADER.size) % _RECORD.size)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_solve, task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), 1):
+                key, score, col = future.result()
+                records[key] = (score, col)
+                partial.write(_RECORD.pack(key, score, col))
+                partial.flush()
+                if done % 50 == 0 or done == len(tasks):
+                    print(f"  {done}/{len(tasks)} in {time.perf_counter() - start_time:.1f}s")
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_pack_header(algorithm, depth, plies, rows, cols, connect, len(records)))
+        for key in sorted(records):
+            score, col = records[key]
+            file.write(_RECORD.pack(key, score, col))
+    os.replace(temp_path, path)
+    os.remove(partial_path)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build opening books by searching the first plies offline")
+    parser.add_argument("--algorithms", nargs="+", default=list(AIAgent.ALGORITHMS), choices=AIAgent.ALGORITHMS)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--plies", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default=BOOK_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in args.algorithms:
+        count = build_book(name, args.depth, args.plies, book_path(name, args.output_dir), args.workers)
+        print(f"Wrote {count} positions to {book_path(name, args.output_dir)}")
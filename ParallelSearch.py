@@ -0,0 +1,253 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from AIAgent import AIAgent, CHANCE_OUTCOMES, SearchTimeout
+from BitBoard import BitBoard
+from MoveOrdering import MoveOrderer
+from TranspositionTable import TranspositionTable
+
+# Fixed positions (column sequences from the empty board) for the speedup report
+REPORT_POSITIONS = ("", "3", "3332", "334241", "33241566", "3324150162", "332415016240", "33241501624055")
+
+# Per-process worker state, set up by _init_worker
+_worker_state = {}
+# Search IDs are unique per process so in-process searches of different instances never share one
+_search_ids = itertools.count(1)
+
+
+def _init_worker(tt_entries, move_ordering):
+    _worker_state['config'] = (tt_entries, move_ordering)
+    _worker_state['tt'] = TranspositionTable(tt_entries) if tt_entries else None
+    _worker_state['move_ordering'] = move_ordering
+    _worker_state['search_id'] = None
+
+
+def _run_task(task):
+    """Search one frontier position. Returns (value, nodes); value is None if the deadline passed."""
+    search_id, computer_player, human_player, algorithm, state, connect, depth, maximizing_player, deadline = task
+
+    tt = _worker_state['tt']
+    if _worker_state['search_id'] != search_id:
+        # Entries from earlier moves can hold deeper results, which would make the
+        # value depend on which worker searched which position
+        if tt is not None:
+            tt.clear()
+        _worker_state['search_id'] = search_id
+
+    board = BitBoard.from_board_state(state, connect=connect)
+    orderer = MoveOrderer(board.cols) if _worker_state['move_ordering'] else None
+    agent = AIAgent(computer_player, human_player, depth, transposition_table=tt, move_orderer=orderer)
+    time_limit = None if deadline is None else max(0.0, deadline - time.time())
+    try:
+        value = agent.evaluate_position(board, algorithm, depth, maximizing_player, time_limit)
+    except SearchTimeout:
+        value = None
+    return value, agent.nodes
+
+
+class ParallelSearch:
+    """
+    Splits a search across worker processes.
+
+    The parent expands the tree split_depth plies deep and every distinct
+    frontier position is searched by a worker with a full window. The frontier
+    values are then combined by minimax (and expectation at chance nodes) in the
+    parent, ties going to the lowest column, so an exhaustive search returns the
+    same move and value as the sequential search for any worker count.
+    """
+
+    def __init__(self, workers=None, split_depth=2, tt_entries=1 << 18, move_ordering=True):
+        if split_depth < 1:
+            raise ValueError("split_depth must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.split_depth = split_depth
+        self.tt_entries = tt_entries
+        self.move_ordering = move_ordering
+        self._executor = None
+        self._search_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.tt_entries, self.move_ordering))
+        return self._executor
+
+    def search(self, agent, board, algorithm, time_limit=None):
+        """
+        Returns (value, best_col) for agent to move on board. Adds the worker node
+        counts to agent.nodes and sets agent.completed_depth, like AIAgent.get_best_move.
+        """
+        self._search_id = next(_search_ids)
+        if time_limit is None:
+            result = self._search_depth(agent, board, algorithm, agent.depth, None)
+            agent.completed_depth = agent.depth
+            return result
+
+        deadline = time.time() + time_limit
+        empty_cells = sum(cell == 0 for column in board.get_board_state() for cell in column)
+        result = None
+        for depth in range(1, empty_cells + 1):
+            # Depth 1 always finishes so there is a move to play
+            iteration = self._search_depth(agent, board, algorithm, depth, deadline if result is not None else None)
+            if iteration is None:
+                break
+            result = iteration
+            agent.completed_depth = depth
+            if time.time() >= deadline:
+                break
+        return result
+
+    def _search_depth(self, agent, board, algorithm, depth, deadline):
+        """One parallel search to depth. Returns (value, best_col), or None if the deadline passed."""
+        tasks = {}
+        root = self._plan(agent, board, algorithm, depth, True, min(self.split_depth, depth), tasks)
+
+        payloads = [(self._search_id, agent.computer_player, agent.human_player, algorithm, state, board.connect, task_depth, maximizing_player, deadline)
+                    for state, task_depth, maximizing_player in tasks]
+        if self.workers == 1:
+            if _worker_state.get('config') != (self.tt_entries, self.move_ordering):
+                _init_worker(self.tt_entries, self.move_ordering)
+            results = map(_run_task, payloads)
+        else:
+            futures = [self._get_executor().submit(_run_task, payload) for payload in payloads]
+            results = (future.result() for future in futures)
+
+        try:
+            for key, (value, nodes) in zip(list(tasks), results):
+                agent.nodes += nodes
+                agent.check_cancelled()
+                if value is None:
+                    return None
+                tasks[key] = value
+        finally:
+            if self.workers > 1:
+                for future in futures:
+                    future.cancel()
+
+        # The root is a MAX node: pick the first column with the highest value
+        kind, children = root
+        best_col = None
+        value = -float('inf')
+        for col, child in children:
+            score = self._resolve(child, tasks)
+            if score > value:
+                value = score
+                best_col = col
+        return value, best_col
+
+    def _plan(self, agent, board, algorithm, depth, maximizing_player, plies, tasks):
+        """
+        Expand the tree plies deep, mirroring AIAgent's search. Returns a plan node:
+        ('value', score), ('task', key), ('chance', [(prob, node)]) or
+        ('max' / 'min', [(col, node)]). Frontier positions are collected in tasks.
+        """
+        score = agent.leaf_value(board, depth)
+        if score is not None:
+            return ('value', score)
+
+        if plies == 0:
+            # Identical frontier positions (e.g. overlapping chance outcomes) become one task
+            key = (tuple(tuple(column) for column in board.get_board_state()), depth, maximizing_player)
+            tasks[key] = None
+            return ('task', key)
+
+        children = []
+        if algorithm.startswith("expected") and maximizing_player:
+            for col in board.get_valid_moves():
+                outcomes = []
+                for offset, prob in CHANCE_OUTCOMES:
+                    landing = col + offset
+                    if board.is_valid_move(landing):
+                        board.make_move(landing, agent.computer_player)
+                        outcomes.append((prob, self._plan(agent, board, algorithm, depth - 1, False, plies - 1, tasks)))
+                        board.undo_move(landing)
+                    else:
+                        outcomes.append((prob, ('value', 0)))
+                children.append((col, ('chance', outcomes)))
+            return ('max', children)
+
+        player = agent.computer_player if maximizing_player else agent.human_player
+        for col in board.get_valid_moves():
+            board.make_move(col, player)
+            children.append((col, self._plan(agent, board, algorithm, depth - 1, not maximizing_player, plies - 1, tasks)))
+            board.undo_move(col)
+        return ('max' if maximizing_player else 'min', children)
+
+    def _resolve(self, node, values):
+        """Value of a plan node once all frontier tasks are searched."""
+        kind, data = node
+        if kind == 'value':
+            return data
+        if kind == 'task':
+            return values[data]
+        if kind == 'chance':
+            expected_value = 0
+            for prob, child in data:
+                expected_value += prob * self._resolve(child, values)
+            return expected_value
+        scores = [self._resolve(child, values) for _, child in data]
+        return max(scores) if kind == 'max' else min(scores)
+
+
+def _time_positions(algorithm, depth, parallel=None):
+    """Search every REPORT_POSITIONS position. Returns (moves, nodes, seconds)."""
+    moves = []
+    nodes = 0
+    start_time = time.perf_counter()
+    for sequence in REPORT_POSITIONS:
+        board = BitBoard()
+        for col in sequence:
+            board.play_at_column(int(col))
+        agent = AIAgent(board.current_player, 3 - board.current_player, depth, parallel_search=parallel)
+        moves.append(agent.get_best_move(board, algorithm))
+        nodes += agent.nodes
+    return moves, nodes, time.perf_counter() - start_time
+
+
+def speedup_report(worker_counts, algorithm, depth, split_depth):
+    """
+    Time the REPORT_POSITIONS search for each worker count and print the
+    speedup over the plain sequential search (AIAgent without parallel_search).
+    The frontier tasks are searched with full windows, so one worker already
+    does more work than the sequential search.
+    """
+    print(f"{algorithm}, depth {depth}, split depth {split_depth}, {len(REPORT_POSITIONS)} positions")
+    print(f"{'workers':>10} {'time (s)':>10} {'speedup':>8} {'nodes':>10}")
+
+    expected_moves, nodes, baseline = _time_positions(algorithm, depth)
+    print(f"{'sequential':>10} {baseline:>10.2f} {1.0:>8.2f} {nodes:>10}")
+
+    for workers in worker_counts:
+        with ParallelSearch(workers=workers, split_depth=split_depth) as parallel:
+            # Start the worker processes before timing
+            if workers > 1:
+                list(parallel._get_executor().map(abs, range(workers)))
+            moves, nodes, elapsed = _time_positions(algorithm, depth, parallel)
+
+        note = "" if moves == expected_moves else "  MOVES DIFFER"
+        print(f"{workers:>10} {elapsed:>10.2f} {baseline / elapsed:>8.2f} {nodes:>10}{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel search speedup report over a fixed position set")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--algorithm", default="minimax_ab", choices=AIAgent.ALGORITHMS)
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--split-depth", type=int, default=2)
+    args = parser.parse_args()
+    speedup_report(args.workers, args.algorithm, args.depth, args.split_depth)
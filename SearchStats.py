@@ -0,0 +1,85 @@
+class SearchStats:
+    """
+    Summary of one AIAgent.get_best_move call, built from counters the search
+    keeps anyway (one list increment per node), so it is always on.
+
+    source is 'search', 'book' (answered by the opening book) or 'endgame'
+    (answered by the endgame solver). nodes_by_ply[i] counts the nodes i plies
+    below the root over all iterations. iterations holds a (depth, seconds,
+    nodes) tuple per completed iteration. hit_rates maps each cache the call
+    probed ('tt', 'expectimax_cache', 'endgame_tt') to its hit rate in this call.
+    """
+
+    def __init__(self, algorithm, source='search', depth=0, value=None, move=None, nodes=0, nodes_by_ply=(),
+                 leaf_evaluations=0, terminal_evaluations=0, cutoffs=0, first_move_cutoffs=0,
+                 hit_rates=None, iterations=(), elapsed=0.0):
+        self.algorithm = algorithm
+        self.source = source
+        self.depth = depth
+        self.value = value
+        self.move = move
+        self.nodes = nodes
+        self.nodes_by_ply = list(nodes_by_ply)
+        self.leaf_evaluations = leaf_evaluations
+        self.terminal_evaluations = terminal_evaluations
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.hit_rates = dict(hit_rates or {})
+        self.iterations = list(iterations)
+        self.elapsed = elapsed
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def effective_branching_factor(self):
+        return self.nodes ** (1 / self.depth) if self.depth > 0 and self.nodes > 0 else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'algorithm': self.algorithm,
+            'source': self.source,
+            'depth': self.depth,
+            'value': self.value,
+            'move': self.move,
+            'nodes': self.nodes,
+            'nodes_by_ply': self.nodes_by_ply,
+            'leaf_evaluations': self.leaf_evaluations,
+            'terminal_evaluations': self.terminal_evaluations,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'effective_branching_factor': self.effective_branching_factor,
+            'hit_rates': self.hit_rates,
+            'iterations': self.iterations,
+            'elapsed': self.elapsed,
+            'nodes_per_second': self.nodes_per_second,
+        }
+
+    def metrics_line(self):
+        """One logfmt line of the scalar fields, for log-based monitoring."""
+        fields = [
+            ('algorithm', self.algorithm), ('source', self.source), ('depth', self.depth), ('move', self.move),
+            ('nodes', self.nodes), ('leaf_evals', self.leaf_evaluations), ('terminal_evals', self.terminal_evaluations),
+            ('cutoffs', self.cutoffs), ('first_move_cutoff_rate', f"{self.first_move_cutoff_rate:.3f}"),
+            ('ebf', f"{self.effective_branching_factor:.2f}"), ('elapsed_ms', f"{self.elapsed * 1000:.1f}"),
+            ('nps', f"{self.nodes_per_second:.0f}"),
+        ]
+        fields += [(f"{name}_hit_rate", f"{rate:.3f}") for name, rate in self.hit_rates.items()]
+        return "search_stats " + " ".join(f"{key}={value}" for key, value in fields)
+
+    def summary(self):
+        """Short text for the GUI status line."""
+        if self.source == 'book':
+            return f"book move (depth {self.depth})"
+        parts = [f"depth {self.depth}", f"{self.nodes:,} nodes", f"{self.nodes_per_second:,.0f} n/s"]
+        if self.source == 'endgame':
+            parts[0] = "solved"
+        elif self.depth > 0:
+            parts.append(f"EBF {self.effective_branching_factor:.1f}")
+        parts += [f"{name} {rate:.0%}" for name, rate in self.hit_rates.items()]
+        return " | ".join(parts)
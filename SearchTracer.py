@@ -0,0 +1,549 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from graphviz import Digraph
+
+
+class SearchTracer:
+    """
+    Hooks the AIAgent search calls while tracing is enabled.
+
+    The agent only touches these methods when it was constructed with a tracer,
+    so an untraced search never formats a label or allocates a graph node.
+    Node kinds are 'max', 'min', 'chance', 'terminal', 'heuristic', 'blocked' and
+    'tt' (a node answered from the transposition table or ExpectimaxCache).
+    """
+
+    def __init__(self):
+        self._node_counter = 0
+
+    def begin(self, algorithm, depth):
+        """Start a new tree for one get_best_move call. Returns the root node ID."""
+        self._node_counter = 0
+        return self.new_node()
+
+    def new_node(self):
+        """Generates a unique ID for each node."""
+        self._node_counter += 1
+        return f"N{self._node_counter}"
+
+    def add_node(self, node_id, kind, depth, edge=None, value=None, alpha=None, beta=None):
+        """Record a node; edge is (parent_id, label) for every node except the root."""
+
+    def update_node(self, node_id, kind, depth, value, alpha=None, beta=None):
+        """Record the current value (and alpha-beta bounds) of an internal node."""
+
+    def mark_pruned(self, parent_id, child_id):
+        """Record that the remaining children of parent_id were cut off after child_id."""
+
+    def finish(self, root_id, value, best_col, best_child_id):
+        """Record the final decision at the root; best_child_id is the root child searched for best_col."""
+
+    def get_source(self):
+        """Returns the Graphviz DOT source string for the GUI to render."""
+        return ""
+
+
+def new_digraph():
+    """Empty Digraph with the tree's dark theme."""
+    # Define Global Graph Attributes for Elegance (Dark theme base)
+    # *** Added 'splines': 'curved' to enable flexible, curved edges ***
+    return Digraph(comment='Connect Four Search Tree',
+                   graph_attr={'rankdir': 'TB', 'bgcolor': '#282a36', 'fontname': 'Palatino', 'nodesep': '0.5', 'ranksep': '0.7', 'splines': 'curved'},
+                   node_attr={'fontname': 'Palatino', 'fontsize': '10', 'color': '#f8f8f2', 'fontcolor': '#f8f8f2'}, # Default white text
+                   edge_attr={'fontname': 'Palatino', 'fontsize': '9', 'color': '#f8f8f2'})
+
+
+def node_style(kind, expected):
+    """Returns (fillcolor, fontcolor, shape) for a node kind."""
+    if kind == 'terminal':
+        return '#bd93f9', '#282a36', 'box'
+    if kind == 'heuristic':
+        return '#f1fa8c', '#282a36', 'box'
+    if kind == 'chance':
+        return '#8be9fd', '#282a36', 'diamond' # Light blue, black font
+    if kind == 'blocked':
+        return 'grey', '#282a36', 'box'
+    if kind == 'tt':
+        return '#ffb86c', '#282a36', 'box' # Orange, black font
+    if expected:
+        return ('#50fa7b', '#282a36', 'ellipse') if kind == 'max' else ('#ff5555', '#f8f8f2', 'ellipse')
+    return ('#ff5555' if kind == 'max' else '#ff79c6'), '#f8f8f2', 'ellipse' # MAX (Red-Pink) vs MIN (Pink)
+
+
+def node_label(kind, depth, value, alpha, beta, expected):
+    if kind == 'terminal':
+        return f"TERMINAL (Draw)\nScore Diff: {value}"
+    if kind == 'heuristic':
+        return f"Value: {value:.2f}"
+    if kind == 'chance':
+        return f"CHANCE\nEV: {value:.2f}"
+    if kind == 'blocked':
+        return "BLOCKED\nValue: 0.00"
+    if kind == 'tt':
+        return f"{'CACHE' if expected else 'TT'} HIT\nValue: {value:.2f}"
+
+    player_label = kind.upper()
+    if expected:
+        label = f"{player_label}\nD={depth}"
+    else:
+        label = f"{player_label} D={depth}"
+    if value is not None:
+        label += f"\nValue: {value:.2f}"
+    if alpha is not None:
+        label += f"\nA: {alpha:.2f}\nB: {beta:.2f}"
+    return label
+
+
+def edge_style(kind):
+    """Attributes of the edge leading to a node of the given kind."""
+    if kind == 'chance':
+        return {'color': '#bd93f9', 'penwidth': '2'} # Purple edge
+    if kind == 'blocked':
+        return {'color': 'grey', 'style': 'dotted', 'penwidth': '1'}
+    return {'color': '#f8f8f2', 'penwidth': '1'}
+
+
+def root_label(depth, algorithm, value, best_col):
+    return f"ROOT (D={depth})\n{algorithm.title()}\nFinal Score: {value:.2f}\nChosen Move: Col {best_col}"
+
+
+# --- Recorded Search Trees ---
+# Node kinds by their code in SearchTree.kind; 0 marks a numbered node that was never recorded
+KINDS = (None, 'max', 'min', 'chance', 'terminal', 'heuristic', 'tt', 'blocked')
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Column name, array typecode; float columns hold NaN for "no value"
+COLUMNS = (('parent', 'i'), ('edge', 'H'), ('depth', 'h'), ('value', 'd'), ('alpha', 'd'), ('beta', 'd'),
+           ('kind', 'B'), ('pruned', 'B'))
+
+# Trace file: header, edge labels (newline separated), then every column padded to 8 bytes.
+# Header: magic, version, node count, search depth, root, best child, best column, root value,
+# algorithm name, size of the label block
+_TRACE_HEADER = struct.Struct("<4sHIhiibd32sI")
+TRACE_MAGIC = b"C4TR"
+TRACE_VERSION = 2
+
+NAN = float('nan')
+
+
+def _optional(number):
+    return None if number != number else number
+
+
+def _padded(size):
+    return -size % 8
+
+
+class SearchTree:
+    """
+    A recorded search tree, stored column-wise in typed arrays.
+
+    Nodes are numbered in creation order, so a parent always comes before its
+    children. Each field is one array indexed by node number (33 bytes a
+    node); edge labels ("Col 3", "P=0.6") are interned in labels. A tree can
+    be saved to a trace file and opened again memory-mapped, without reading
+    it into memory. A tree still being recorded can spill() its columns to
+    memory-mapped files, so a huge search does not have to fit in memory.
+
+    to_dot() draws only the top levels (or the principal variation and its
+    siblings) below any node; every hidden subtree is replaced by one summary
+    node that can be expanded on request. to_json() and to_numpy() export any
+    subtree for offline analysis.
+    """
+
+    def __init__(self, algorithm, depth):
+        self.algorithm = algorithm
+        self.search_depth = depth
+        self.expected = algorithm.startswith("expected")
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self.labels = []
+        self._label_codes = {}
+        self.root = None
+        self.root_value = None
+        self.best_col = None
+        self.best_child = None
+        self._mmap = None
+        self._spill = None  # _SpilledColumns while the columns live in spill files
+        self._child_start = self._child_list = self._sizes = None
+
+    def __len__(self):
+        return self._spill.count if self._spill is not None else len(self.kind)
+
+    # --- Recording ---
+    def new_node(self):
+        if self._spill is not None:
+            self._child_start = self._child_list = self._sizes = None
+            return self._spill.new_node()
+        self.parent.append(-1)
+        self.edge.append(0)
+        self.depth.append(0)
+        for column in (self.value, self.alpha, self.beta):
+            column.append(NAN)
+        self.kind.append(0)
+        self.pruned.append(0)
+        self._child_start = self._child_list = self._sizes = None
+        return len(self.kind) - 1
+
+    def spill(self, path):
+        """
+        Move the columns into growable memory-mapped files named path.<column>,
+        which the operating system can write out and drop from memory while
+        recording goes on. close() removes the files; save() the tree first to
+        keep it.
+        """
+        if self._spill is None and self._mmap is None:
+            self._spill = _SpilledColumns(self, path)
+
+    def set_node(self, node, kind, depth, value, alpha, beta):
+        self.kind[node] = _KIND_CODES[kind]
+        self.depth[node] = depth
+        self.value[node] = NAN if value is None else value
+        self.alpha[node] = NAN if alpha is None else alpha
+        self.beta[node] = NAN if beta is None else beta
+
+    def set_edge(self, node, parent, label):
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self.labels)
+            self.labels.append(label)
+        self.parent[node] = parent
+        self.edge[node] = code
+
+    # --- Queries ---
+    def node(self, node):
+        """All fields of node as a dict (None for missing values)."""
+        parent = self.parent[node]
+        return {
+            'id': node,
+            'parent': parent if parent >= 0 else None,
+            'edge': self.labels[self.edge[node]] if parent >= 0 else None,
+            'kind': KINDS[self.kind[node]],
+            'depth': self.depth[node],
+            'value': _optional(self.value[node]),
+            'alpha': _optional(self.alpha[node]),
+            'beta': _optional(self.beta[node]),
+            'pruned': bool(self.pruned[node]),
+        }
+
+    def children(self, node):
+        """Recorded children of node, in the order they were searched."""
+        if self._child_start is None:
+            # Counting sort of the recorded nodes by parent
+            count = len(self)
+            start = array('i', bytes(4 * (count + 1)))
+            for child in range(count):
+                parent = self.parent[child]
+                if parent >= 0 and self.kind[child]:
+                    start[parent + 1] += 1
+            for node_index in range(count):
+                start[node_index + 1] += start[node_index]
+            child_list = array('i', bytes(4 * start[count]))
+            fill = array('i', start)
+            for child in range(count):
+                parent = self.parent[child]
+                if parent >= 0 and self.kind[child]:
+                    child_list[fill[parent]] = child
+                    fill[parent] += 1
+            self._child_start, self._child_list = start, child_list
+        return self._child_list[self._child_start[node]:self._child_start[node + 1]].tolist()
+
+    def subtree(self, node):
+        """Recorded nodes of the subtree below (and including) node, parents first."""
+        nodes = [node]
+        for parent in nodes:
+            nodes.extend(self.children(parent))
+        return nodes
+
+    def subtree_sizes(self):
+        """Number of recorded nodes in the subtree of every node."""
+        if self._sizes is None:
+            sizes = array('i', (1 if code else 0 for code in self.kind))
+            for node in range(len(self) - 1, 0, -1):
+                parent = self.parent[node]
+                if parent >= 0:
+                    sizes[parent] += sizes[node]
+            self._sizes = sizes
+        return self._sizes
+
+    def principal_variation(self):
+        """
+        Nodes along the expected line of play: the chosen move at the root, then
+        the best child of every MAX / MIN node and the most likely outcome of
+        every chance node.
+        """
+        if self.root is None:
+            return []
+        line = [self.root]
+        node = self.best_child
+        while node is not None:
+            line.append(node)
+            children = [child for child in self.children(node)
+                        if self.value[child] == self.value[child] and KINDS[self.kind[child]] != 'blocked']
+            if not children:
+                break
+            kind = KINDS[self.kind[node]]
+            if kind == 'max':
+                node = max(children, key=self.value.__getitem__)
+            elif kind == 'min':
+                node = min(children, key=self.value.__getitem__)
+            else:
+                node = children[0]  # Outcomes are searched most likely first
+        return line
+
+    # --- Export ---
+    def visible_nodes(self, levels=3, pv_only=False, expanded=(), root=None):
+        """Nodes drawn by to_dot() for the given view."""
+        top = self.root if root is None else root
+        if top is None:
+            return set()
+        visible = {top}
+        if pv_only and root is None:
+            for node in self.principal_variation():
+                visible.add(node)
+                visible.update(self.children(node))
+        else:
+            frontier = [top]
+            for _ in range(levels):
+                frontier = [child for node in frontier for child in self.children(node)]
+                visible.update(frontier)
+        # Parents are numbered before their children, so nested expansions open in order
+        for node in sorted(expanded):
+            if node in visible:
+                visible.update(self.children(node))
+        return visible
+
+    def to_dot(self, levels=3, pv_only=False, expanded=(), root=None):
+        """
+        DOT source of one view of the tree, from the search root or from any
+        node given as root. Summary nodes link to 'expand:<node>'.
+        """
+        dot = new_digraph()
+        visible = self.visible_nodes(levels, pv_only, expanded, root)
+        sizes = self.subtree_sizes()
+        top = self.root if root is None else root
+
+        for node in sorted(visible):
+            name = f"N{node}"
+            kind = KINDS[self.kind[node]]
+            value, alpha, beta = _optional(self.value[node]), _optional(self.alpha[node]), _optional(self.beta[node])
+            if node == self.root and self.root_value is not None:
+                dot.node(name, label=root_label(self.search_depth, self.algorithm, self.root_value, self.best_col),
+                         style='filled', fillcolor='#50fa7b', shape='box', fontcolor='#282a36')
+            else:
+                fillcolor, fontcolor, shape = node_style(kind, self.expected)
+                dot.node(name, label=node_label(kind, self.depth[node], value, alpha, beta, self.expected),
+                         style='filled', fillcolor=fillcolor, shape=shape, margin='0.1', fontcolor=fontcolor)
+
+            parent = self.parent[node]
+            if parent >= 0 and node != top:
+                dot.edge(f"N{parent}", name, label=self.labels[self.edge[node]], **edge_style(kind))
+                if self.pruned[node]:
+                    dot.edge(f"N{parent}", name, color='#ff5555', style='dashed', label='PRUNED', penwidth='2')
+
+            hidden = [child for child in self.children(node) if child not in visible]
+            if hidden:
+                count = sum(sizes[child] for child in hidden)
+                dot.node(f"S{node}", label=f"+{count:,} nodes\n(click to expand)", shape='box', style='dashed',
+                         color='#6272a4', fontcolor='#f8f8f2', URL=f"expand:{node}")
+                dot.edge(name, f"S{node}", color='#6272a4', style='dashed')
+
+        if self.best_child is not None and self.root in visible and self.best_child in visible:
+            dot.edge(f"N{self.root}", f"N{self.best_child}", label=f"Col {self.best_col}", color='#50fa7b',
+                     penwidth='3', fontcolor='#50fa7b')
+        return dot.source
+
+    def to_json(self, root=None, max_depth=None):
+        """The subtree below root (default: the search root) as nested JSON, at most max_depth levels deep."""
+        def nested(node, levels):
+            record = self.node(node)
+            if max_depth is None or levels < max_depth:
+                record['children'] = [nested(child, levels + 1) for child in self.children(node)]
+            return record
+
+        top = self.root if root is None else root
+        return json.dumps(nested(top, 0) if top is not None else None)
+
+    def to_numpy(self, root=None):
+        """
+        Columns of the subtree below root as a dict of NumPy arrays, parents
+        first. Without root the whole tree is returned without copying.
+        """
+        import numpy as np
+        if root is None:
+            return {name: np.frombuffer(getattr(self, name), dtype=typecode) for name, typecode in COLUMNS}
+        nodes = np.array(self.subtree(root), dtype=np.int32)
+        return {'node': nodes, **{name: np.frombuffer(getattr(self, name), dtype=typecode)[nodes]
+                                  for name, typecode in COLUMNS}}
+
+    # --- Trace Files ---
+    def save(self, path):
+        """Write the tree to a trace file (see open())."""
+        label_block = "\n".join(self.labels).encode()
+        header = _TRACE_HEADER.pack(
+            TRACE_MAGIC, TRACE_VERSION, len(self), self.search_depth,
+            -1 if self.root is None else self.root, -1 if self.best_child is None else self.best_child,
+            -1 if self.best_col is None else self.best_col, NAN if self.root_value is None else self.root_value,
+            self.algorithm.encode(), len(label_block))
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(header)
+            file.write(label_block + bytes(_padded(len(header) + len(label_block))))
+            count = len(self)
+            for name, _ in COLUMNS:
+                # Spilled columns have room past the last node; write only the nodes
+                data = memoryview(getattr(self, name))[:count]
+                file.write(data)
+                file.write(bytes(_padded(data.nbytes)))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def open(cls, path):
+        """
+        A read-only tree backed by a memory-mapped trace file; columns are read
+        from the page cache as they are accessed. close() releases the file.
+        """
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, depth, root, best_child, best_col, root_value, name, label_size = \
+            _TRACE_HEADER.unpack_from(data)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            data.close()
+            raise ValueError(f"Not a search trace file: {path}")
+
+        tree = cls(name.rstrip(b"\0").decode(), depth)
+        offset = _TRACE_HEADER.size + label_size
+        labels = bytes(data[_TRACE_HEADER.size:offset]).decode()
+        tree.labels = labels.split("\n") if labels else []
+        offset += _padded(offset)
+        view = memoryview(data)
+        for column_name, typecode in COLUMNS:
+            size = count * array(typecode).itemsize
+            setattr(tree, column_name, view[offset:offset + size].cast(typecode))
+            offset += size + _padded(size)
+        tree.root = root if root >= 0 else None
+        tree.best_child = best_child if best_child >= 0 else None
+        tree.best_col = best_col if best_col >= 0 else None
+        tree.root_value = _optional(root_value)
+        tree._mmap = data
+        return tree
+
+    def close(self):
+        """Release the trace file of a tree returned by open(), or remove the files of a spilled tree."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self._mmap is not None:
+            for name, typecode in COLUMNS:
+                getattr(self, name).release()
+                setattr(self, name, array(typecode))
+            self._mmap.close()
+            self._mmap = None
+
+
+class _SpilledColumns:
+    """The columns of a SearchTree being recorded, in one growable memory-mapped file each."""
+
+    def __init__(self, tree, path):
+        self.tree = tree
+        self.count = len(tree.kind)
+        self.capacity = max(1 << 16, 2 * self.count)
+        self._files = {}
+        self._maps = {}
+        for name, typecode in COLUMNS:
+            column = getattr(tree, name)
+            file = open(f"{path}.{name}", "w+b")
+            file.truncate(self.capacity * column.itemsize)
+            data = mmap.mmap(file.fileno(), 0)
+            data[:self.count * column.itemsize] = memoryview(column).cast('B')
+            self._files[name], self._maps[name] = file, data
+            setattr(tree, name, memoryview(data).cast(typecode))
+
+    def new_node(self):
+        if self.count == self.capacity:
+            self._grow()
+        tree, node = self.tree, self.count
+        tree.parent[node] = -1
+        for column in (tree.value, tree.alpha, tree.beta):
+            column[node] = NAN
+        self.count += 1
+        return node
+
+    def _grow(self):
+        # A map can only be resized once the column view on it is released
+        self.capacity *= 2
+        for name, typecode in COLUMNS:
+            getattr(self.tree, name).release()
+            data = self._maps[name]
+            data.resize(self.capacity * array(typecode).itemsize)
+            setattr(self.tree, name, memoryview(data).cast(typecode))
+
+    def close(self):
+        for name, typecode in COLUMNS:
+            getattr(self.tree, name).release()
+            setattr(self.tree, name, array(typecode))
+            self._maps[name].close()
+            self._files[name].close()
+            os.remove(self._files[name].name)
+
+
+class RecordingTracer(SearchTracer):
+    """
+    Records the search as a SearchTree instead of building DOT while searching.
+
+    Each get_best_move call starts a new tree (the previous one stays valid for
+    whoever holds it); get_source() draws the top levels of the last one.
+    With spill_path set, a tree reaching spill_nodes nodes is spilled to
+    memory-mapped column files next to it while the search goes on, and once
+    finished it is saved to spill_path and reopened from there, so a huge
+    trace never has to fit in memory.
+    """
+
+    def __init__(self, spill_path=None, spill_nodes=1_000_000):
+        super().__init__()
+        self.tree = None
+        self.spill_path = spill_path
+        self.spill_nodes = spill_nodes
+
+    def begin(self, algorithm, depth):
+        if self.tree is not None and self.tree._spill is not None:
+            self.tree.close()  # An abandoned iteration nobody else holds
+        self.tree = SearchTree(algorithm, depth)
+        return self.tree.new_node()
+
+    def new_node(self):
+        tree = self.tree
+        node = tree.new_node()
+        if node + 1 == self.spill_nodes and self.spill_path is not None:
+            tree.spill(self.spill_path + ".columns")
+        return node
+
+    def add_node(self, node_id, kind, depth, edge=None, value=None, alpha=None, beta=None):
+        tree = self.tree
+        tree.set_node(node_id, kind, depth, value, alpha, beta)
+        if edge is not None:
+            tree.set_edge(node_id, *edge)
+
+    def update_node(self, node_id, kind, depth, value, alpha=None, beta=None):
+        self.tree.set_node(node_id, kind, depth, value, alpha, beta)
+
+    def mark_pruned(self, parent_id, child_id):
+        self.tree.pruned[child_id] = 1
+
+    def finish(self, root_id, value, best_col, best_child_id):
+        tree = self.tree
+        tree.root = root_id
+        tree.root_value = value
+        tree.best_col = best_col
+        tree.best_child = best_child_id
+        if tree._spill is not None:
+            tree.save(self.spill_path)
+            tree.close()
+            self.tree = SearchTree.open(self.spill_path)
+
+    def get_source(self):
+        return self.tree.to_dot() if self.tree is not None else ""
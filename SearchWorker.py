@@ -0,0 +1,121 @@
+import threading
+
+from AIAgent import SearchCancelled
+
+
+class SearchWorker:
+    """
+    Runs AIAgent.get_best_move on a background thread.
+
+    The search works on a copy of the board, so the caller may keep drawing the
+    real one. Poll done() (e.g. from Tk's root.after) and read result or error
+    once it returns True; progress() can be polled while the search runs.
+    """
+
+    def __init__(self, agent, board, algorithm, time_limit=None):
+        self.agent = agent
+        self.board = board.copy()
+        self.algorithm = algorithm
+        self.time_limit = time_limit
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="search-worker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.agent.get_best_move(self.board, self.algorithm, time_limit=self.time_limit,
+                                                   cancel_event=self._cancel_event)
+        except SearchCancelled:
+            self.cancelled = True
+        except Exception as error:  # Handed to the polling thread instead of dying silently
+            self.error = error
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def cancel(self):
+        """Ask the search to stop; it exits at its next node-count check."""
+        self._cancel_event.set()
+
+    def progress(self):
+        """Depth, node count and nodes/sec of the running search."""
+        return self.agent.get_progress()
+
+
+class Ponderer:
+    """
+    Searches the computer's answer to every possible human move while the human is thinking.
+
+    Replies are pondered one after another on a background thread, the predicted
+    human move first (the hash move the agent's transposition table holds for the
+    position). Finished searches are kept per human move and their table entries
+    stay with the agent, so an unfinished reply still starts warm. After the human
+    moves, take(col) stops pondering and returns the stored answer, or None.
+    """
+
+    def __init__(self, agent, board, algorithm, time_limit=None, predicted_only=False):
+        self.agent = agent
+        self.board = board.copy()
+        self.algorithm = algorithm
+        self.time_limit = time_limit
+        self.predicted_only = predicted_only
+        self.results = {}  # Human column -> computer column
+        self.stats = {}  # Human column -> SearchStats of that search
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ponder-worker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def candidate_moves(self):
+        """Human moves to ponder, most likely first."""
+        moves = self.board.get_valid_moves()
+        center = (self.board.cols - 1) / 2
+        moves.sort(key=lambda col: abs(col - center))
+
+        predicted = None
+        tt = self.agent.transposition_table
+        if tt is not None and hasattr(self.board, 'hash'):
+            entry = tt.probe(self.board.key)
+            hash_move = self.board.canonical_move(entry[4]) if entry is not None else None
+            if hash_move in moves:
+                predicted = hash_move
+        if predicted is not None:
+            moves.remove(predicted)
+            moves.insert(0, predicted)
+            if self.predicted_only:
+                return [predicted]
+        return moves
+
+    def _run(self):
+        for col in self.candidate_moves():
+            if self._cancel_event.is_set():
+                return
+            board = self.board.copy()
+            board.play_at_column(col)
+            if board.game_over:
+                continue
+            try:
+                self.results[col] = self.agent.get_best_move(board, self.algorithm, time_limit=self.time_limit,
+                                                             cancel_event=self._cancel_event)
+                self.stats[col] = self.agent.get_search_stats()
+            except SearchCancelled:
+                return
+
+    def stop(self):
+        """Cancel pondering and wait for the thread, so the agent is free for the real search."""
+        self._cancel_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def take(self, col):
+        """Stop pondering and return the computer's answer to human move col, if it was finished."""
+        self.stop()
+        return self.results.get(col)
@@ -0,0 +1,116 @@
+import random
+from functools import lru_cache
+
+# Bound flags stored with every entry
+EXACT = 0
+LOWER_BOUND = 1  # The true value is >= the stored value (search failed high)
+UPPER_BOUND = 2  # The true value is <= the stored value (search failed low)
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(rows, cols):
+    """
+    Random 64-bit keys indexed [player][cell] for a board of the given size.
+    Cells use the BitBoard numbering col * (rows + 1) + row. The generator is
+    seeded so hashes are stable across runs and processes.
+    """
+    rng = random.Random(rows * 1000 + cols)
+    cells = cols * (rows + 1)
+    return (None,
+            tuple(rng.getrandbits(64) for _ in range(cells)),
+            tuple(rng.getrandbits(64) for _ in range(cells)))
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results keyed by Zobrist hash.
+
+    Each entry is a (key, depth, value, flag, best_move, generation) tuple.
+    The table never grows past max_entries slots. With the 'depth' policy every
+    bucket has one slot that is only replaced by an equal or deeper search (or
+    by any search once the entry is from an earlier move). With 'two_tier'
+    every bucket also has an always-replace slot that receives the newest entry
+    or the one displaced from the depth-preferred slot.
+    """
+
+    POLICIES = ('depth', 'two_tier')
+
+    def __init__(self, max_entries=1 << 20, policy='two_tier'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.policy = policy
+        self._ways = 2 if policy == 'two_tier' else 1
+
+        buckets = 1
+        while buckets * 2 * self._ways <= max_entries:
+            buckets *= 2
+        self._mask = buckets - 1
+        self._slots = [None] * (buckets * self._ways)
+        self._generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0  # Probes that found the bucket taken by other positions
+        self.stores = 0
+
+    def new_search(self):
+        """Mark entries stored so far as belonging to an earlier move."""
+        self._generation += 1
+
+    def clear(self):
+        self._slots = [None] * len(self._slots)
+        self.reset_stats()
+
+    def probe(self, key):
+        """Returns the entry stored for key, or None."""
+        slots = self._slots
+        index = (key & self._mask) * self._ways
+        occupied = False
+        for slot in range(index, index + self._ways):
+            entry = slots[slot]
+            if entry is not None:
+                if entry[0] == key:
+                    self.hits += 1
+                    return entry
+                occupied = True
+
+        if occupied:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, best_move):
+        slots = self._slots
+        index = (key & self._mask) * self._ways
+        entry = (key, depth, value, flag, best_move, self._generation)
+        self.stores += 1
+
+        current = slots[index]
+        if current is None or current[0] == key or depth >= current[1] or current[5] != self._generation:
+            slots[index] = entry
+            if self._ways == 2 and current is not None and current[0] != key:
+                slots[index + 1] = current  # Demote the displaced entry
+        elif self._ways == 2:
+            slots[index + 1] = entry
+
+    @property
+    def capacity(self):
+        return len(self._slots)
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def get_stats(self):
+        """Counters for monitoring: hits, misses, collisions, stores and fill."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hit_rate(),
+            'filled': sum(1 for entry in self._slots if entry is not None),
+            'capacity': self.capacity,
+        }
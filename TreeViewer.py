@@ -0,0 +1,64 @@
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from graphviz import Source
+
+_AREA = re.compile(r"<area\b([^>]*)>")
+_ATTRIBUTE = re.compile(r'(\w+)="([^"]*)"')
+
+
+def render_view(tree, levels=3, pv_only=False, expanded=()):
+    """
+    Render one view of a SearchTree (see SearchTree.to_dot). Returns
+    (png_bytes, targets) where targets maps the node behind every collapsed
+    summary to the (x0, y0, x1, y1) box of that summary in the image.
+    """
+    source = Source(tree.to_dot(levels, pv_only, expanded))
+    png_bytes = source.pipe(format='png')
+    image_map = source.pipe(format='cmapx').decode()
+
+    targets = {}
+    for area in _AREA.findall(image_map):
+        attributes = dict(_ATTRIBUTE.findall(area))
+        href = attributes.get('href', '')
+        if not href.startswith('expand:') or 'coords' not in attributes:
+            continue
+        coords = [int(float(value)) for value in attributes['coords'].split(',')]
+        xs, ys = coords[0::2], coords[1::2]
+        targets[int(href[len('expand:'):])] = (min(xs), min(ys), max(xs), max(ys))
+    return png_bytes, targets
+
+
+class TreeRenderer:
+    """
+    Renders search tree views on one background thread so Graphviz never
+    blocks the GUI. Requests return a Future; finished views are kept per
+    (move, view) so going back to an earlier move or view is instant.
+    """
+
+    def __init__(self, max_views=32):
+        self.max_views = max_views
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tree-render")
+        self._views = OrderedDict()
+
+    def request(self, move_number, tree, levels=3, pv_only=False, expanded=()):
+        """Future of render_view() for this view of the tree searched for move_number."""
+        key = (move_number, levels if not pv_only else None, pv_only, frozenset(expanded))
+        future = self._views.get(key)
+        if future is not None and not (future.done() and future.exception() is not None):
+            self._views.move_to_end(key)
+            return future
+
+        future = self._executor.submit(render_view, tree, levels, pv_only, frozenset(expanded))
+        self._views[key] = future
+        while len(self._views) > self.max_views:
+            self._views.popitem(last=False)
+        return future
+
+    def clear(self):
+        self._views.clear()
+
+    def close(self):
+        self._views.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
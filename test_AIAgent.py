@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from ExpectimaxCache import ExpectimaxCache
+
+
+def random_positions(count, seed, max_plies=20):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = BitBoard()
+        for _ in range(rng.randint(0, max_plies)):
+            board.play_at_column(rng.choice(board.get_valid_moves()))
+        if not board.game_over:
+            positions.append(board)
+    return positions
+
+
+def test_expected_minimax_ignores_star_bounds_in_a_shared_cache():
+    # Star1/Star2 leave bounds for the positions two plies on, where a later
+    # expected_minimax search of the same game looks them up
+    for board in random_positions(3, seed=12):
+        player = board.current_player
+        cache = ExpectimaxCache()
+        AIAgent(player, 3 - player, 5, expectimax_cache=cache).get_best_move(board, "expected_minimax_star")
+        for first in board.get_valid_moves():
+            for second in board.get_valid_moves():
+                later = board.copy()
+                later.play_at_column(first)
+                if later.play_at_column(second) is None or later.game_over:
+                    continue
+                shared = AIAgent(player, 3 - player, 3, expectimax_cache=cache)
+                plain = AIAgent(player, 3 - player, 3)
+                assert shared.get_best_move(later, "expected_minimax") == plain.get_best_move(later, "expected_minimax")
+                assert shared.last_value == pytest.approx(plain.last_value)
+
+
+def test_pvs_orders_moves_without_tables_of_the_agent():
+    board = BitBoard()
+    for col in "332415":
+        board.play_at_column(int(col))
+    player = board.current_player
+    pvs = AIAgent(player, 3 - player, 7)
+    alpha_beta = AIAgent(player, 3 - player, 7)
+    assert pvs.get_best_move(board, "pvs") == alpha_beta.get_best_move(board, "minimax_ab")
+    assert pvs.last_value == alpha_beta.last_value
+    assert pvs.nodes < alpha_beta.nodes
+    assert pvs.transposition_table is None and pvs.move_orderer is None
@@ -0,0 +1,18 @@
+import io
+import json
+
+from BatchAnalysis import analyze_stream
+
+DEFAULTS = {'algorithm': 'minimax_ab', 'depth': 2, 'time_limit': None, 'rows': 6, 'cols': 7, 'connect': 4}
+
+
+def test_blank_lines_keep_line_numbers_and_ids():
+    lines = ["33\n", "\n", "334\n", '{"id": "bad", "moves": "3", "depth": 0}\n', "   \n", "p6 3344\n", "9\n"]
+    output = io.StringIO()
+    assert analyze_stream(lines, output, DEFAULTS, workers=2, chunk_size=3) == 5
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['id'] for record in records] == [1, 3, 'bad', 'p6', 7]
+    assert 'error' not in records[1] and 'error' not in records[3]
+    assert records[2]['line'] == 4 and 'depth' in records[2]['error']
+    assert records[4]['line'] == 7 and 'error' in records[4]
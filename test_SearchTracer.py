@@ -0,0 +1,41 @@
+import pytest
+
+from AIAgent import AIAgent
+from BitBoard import BitBoard
+from SearchTracer import RecordingTracer, SearchTree
+
+
+@pytest.mark.parametrize("algorithm", ["minimax", "minimax_ab", "pvs"])
+def test_principal_variation_is_a_path_from_the_root(algorithm):
+    board = BitBoard()
+    for col in (3, 2, 4):
+        board.play_at_column(col)
+    tracer = RecordingTracer()
+    depth = 4
+    move = AIAgent(2, 1, depth, tracer=tracer).get_best_move(board, algorithm)
+
+    tree = tracer.tree
+    line = tree.principal_variation()
+    assert len(line) == depth + 1
+    assert line[0] == tree.root
+    assert tree.node(line[1])['edge'].split(' (')[0] == f"Col {move}"  # pvs marks re-searched children
+    for parent, child in zip(line, line[1:]):
+        assert tree.parent[child] == parent
+    assert set(line) <= tree.visible_nodes(pv_only=True)
+
+
+@pytest.mark.parametrize("spill_nodes", [2, 1_000_000])
+def test_depths_past_127_survive_a_trace_file(tmp_path, spill_nodes):
+    path = str(tmp_path / "deep.trace")
+    tracer = RecordingTracer(spill_path=path, spill_nodes=spill_nodes)
+    root = tracer.begin("minimax", 300)
+    tracer.add_node(root, 'max', 300)
+    child = tracer.new_node()
+    tracer.add_node(child, 'heuristic', 299, (root, "Col 3"), value=1.0)
+    tracer.finish(root, 1.0, 3, child)
+    tracer.tree.save(path)
+
+    tree = SearchTree.open(path)
+    assert tree.search_depth == 300
+    assert tree.node(root)['depth'] == 300 and tree.node(child)['depth'] == 299
+    tree.close()